@@ -0,0 +1,143 @@
+'''Headless benchmark of the code highlighting engines (`HIGHLIGHTER` in main.py).
+
+For each engine, on the full page:
+- bytes shipped: the page itself, and the engine's own scripts & stylesheets;
+- server render time: importing main.py (builds the page, tokenizes in "server" mode) and serializing the page;
+- tokenization time: highlighting every code block once, as the client would.
+  highlight.js and PrismJS run in Node (highlight.js needs `python main.py vendor` first, and VENDOR = True in main.py);
+  their line-numbering plugins and DOM updates are not counted.
+
+    python bench.py [server|hljs|prism …]
+'''
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from html import unescape
+
+root = os.path.dirname(os.path.abspath(__file__))
+engines = ('server', 'hljs', 'prism')
+runs = 5
+
+# Client engines: the script tokenizing the page, and how Node calls it.
+client = {
+    'hljs':  ('vendor/highlight.min.js', 'hljs',
+              'lang ? (e.getLanguage(lang) ? e.highlight(code, {language: lang}) : null) : e.highlightAuto(code)'),
+    'prism': ('style/prism-python.js', 'Prism',
+              'e.languages[lang] ? e.highlight(code, e.languages[lang], lang) : null'),
+}
+node_js = '''
+const vm = require("vm"), fs = require("fs");
+const [src, name, call, runs] = process.argv.slice(1);
+const ctx = {}; vm.createContext(ctx);
+vm.runInContext(fs.readFileSync(src, "utf8"), ctx);
+const e = ctx[name], blocks = JSON.parse(fs.readFileSync(0, "utf8"));
+const highlight = new Function("e", "code", "lang", "return " + call);
+let best = Infinity;
+for (let i = 0; i < +runs; i++) {
+  const t = process.hrtime.bigint();
+  for (const [code, lang] of blocks) highlight(e, code, lang);
+  best = Math.min(best, Number(process.hrtime.bigint() - t) / 1e6);
+}
+console.log(best);
+'''
+
+
+def best_of(f, n=runs):
+    out = []
+    for _ in range(n):
+        t = time.perf_counter(); f(); out.append(time.perf_counter() - t)
+    return min(out)
+
+
+def file_bytes(path):
+    with open(os.path.join(root, path), 'rb') as f: data = f.read()
+    return len(data), len(gzip.compress(data))
+
+
+#-----------------------------------------------------------------------------
+# One engine, in its own process: main.py reads HIGHLIGHTER at import
+
+def child(engine):
+    os.environ['HIGHLIGHTER'] = engine
+    sys.path.insert(0, root)
+    t = time.perf_counter()
+    import main
+    imported = time.perf_counter() - t
+    from code.render import flatten, render_app_doc, walk
+
+    body = render_app_doc(*main.page, app=main.app)
+    rendered = best_of(lambda: render_app_doc(*main.page, app=main.app))
+    # The engine's own hdrs: local files (vendored/fingerprinted or not), inline scripts, CDN files.
+    assets, cdn = [0, 0], []
+    for o in flatten(main.highlight_hdrs):
+        url = o.attrs.get('href') or o.attrs.get('src')
+        if url is None:
+            n = len(str(o.children[0]).encode()) if o.children else 0
+            assets = [assets[0] + n, assets[1] + n]
+            continue
+        path = main.vendor_urls.get(url, url).lstrip('/')
+        path = main.fingerprints.get(path, path)
+        if os.path.isfile(os.path.join(root, path)): assets = [a + b for a, b in zip(assets, file_bytes(path))]
+        else: cdn.append(url)
+    # Code blocks as written in main.py: server-highlighted ones are turned back into text.
+    blocks = []
+    for o in walk(main.page):
+        if getattr(o, 'tag', '') != 'code' or 'highlight' not in o.attrs.get('class', ''): continue
+        lang = re.search(r'language-(\S+)', o.attrs['class'])
+        blocks.append((unescape(re.sub(r'<[^>]+>', '', ''.join(map(str, o.children)))), lang and lang.group(1)))
+    print(json.dumps(dict(page=[len(body), len(gzip.compress(body))], assets=assets, cdn=cdn,
+                          imported=imported, rendered=rendered, blocks=blocks)))
+
+
+#-----------------------------------------------------------------------------
+# Tokenization
+
+def tokenize_server(blocks):
+    from code import highlight as h
+    def run():
+        h.cache.clear()
+        for code, lang in blocks: h.highlight(code, lang, line_numbers=True)
+    return best_of(run)
+
+
+def tokenize_client(engine, blocks):
+    '''Seconds, or a reason why it couldn't run.
+    '''
+    src, name, call = client[engine]
+    if not shutil.which('node'): return 'no node'
+    if not os.path.isfile(os.path.join(root, src)): return 'not vendored'
+    r = subprocess.run(['node', '-e', node_js, os.path.join(root, src), name, call, str(runs)],
+                       input=json.dumps(blocks), capture_output=True, text=True, cwd=root)
+    return float(r.stdout) / 1000 if r.returncode == 0 else 'failed'
+
+
+def bench(engine):
+    r = subprocess.run([sys.executable, __file__, '--child', engine], capture_output=True, text=True, cwd=root)
+    if r.returncode: sys.exit(r.stderr)
+    out = json.loads(r.stdout.strip().splitlines()[-1])
+    blocks = out.pop('blocks')
+    out['tokenized'] = tokenize_server(blocks) if engine == 'server' else tokenize_client(engine, blocks)
+    out['blocks'] = len(blocks)
+    return out
+
+
+def kb(n): return f'{n/1024:.1f}'
+
+def ms(s): return f'{s*1000:.1f}' if isinstance(s, float) else s
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']: child(sys.argv[2]); sys.exit()
+    cols = ('engine', 'page KB', 'page gz', 'engine KB', 'engine gz', 'CDN files', 'import ms', 'render ms', 'tokenize ms')
+    print(('{:<8}' + '{:>14}' * (len(cols) - 1)).format(*cols))
+    for engine in sys.argv[1:] or engines:
+        r = bench(engine)
+        row = (engine, kb(r['page'][0]), kb(r['page'][1]), kb(r['assets'][0]), kb(r['assets'][1]), len(r['cdn']),
+               ms(r['imported']), ms(r['rendered']), ms(r['tokenized']))
+        print(('{:<8}' + '{:>14}' * (len(cols) - 1)).format(*row))
+    print(f'{r["blocks"]} code blocks; CDN files are not counted in engine KB (`python main.py vendor` and VENDOR = True to count them).')
@@ -0,0 +1,192 @@
+'''Static assets: content-hashed (fingerprinted) file names and link rewriting.
+'''
+import mimetypes
+import os
+import re
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+
+from fasthtml.common import NotStr
+from starlette.convertors import CONVERTOR_TYPES
+from starlette.responses import FileResponse
+
+from .encoding import compress, encodings, exts, negotiate
+from .render import Prerendered
+
+assets = ('style/*', 'vendor/*', 'favicon.ico')     # everything the static route serves
+# Extensions of FastHTML's `{fname:path}.{ext:static}` route: other files would be linked, then 404.
+static_exts = tuple('.' + e for e in CONVERTOR_TYPES['static'].regex.split('|'))
+link_attrs = ('href', 'src', 'hx-get', 'hx-post')
+immutable = {'Cache-Control': 'public, max-age=31536000, immutable'}
+
+
+def fingerprint(path, data:bytes|None=None) -> str:
+    '''Returns `path` with a short content hash before its extension.
+    `style/prism.js` → `style/prism.3f9a1c2b.js`
+    '''
+    p = Path(path)
+    h = sha256(p.read_bytes() if data is None else data).hexdigest()[:8]
+    return p.with_name(f'{p.stem}.{h}{p.suffix}').as_posix()
+
+
+def find_assets(root='.', patterns=assets) -> list:
+    '''Returns the paths relative to `root` the static route serves, sorted (no .json, no .gz siblings…).
+    '''
+    root = Path(root)
+    return sorted({p.relative_to(root).as_posix() for pat in patterns for p in root.glob(pat)
+                   if p.is_file() and p.suffix in static_exts})
+
+
+def manifest(paths, root='.') -> dict:
+    '''Returns `{path: fingerprinted path}`.
+    '''
+    return {p: fingerprint(p, (Path(root)/p).read_bytes()) for p in paths}
+
+
+def rewrite_links(html:str, urls:dict) -> str:
+    '''Rewrites link attributes (href, src, hx-get…) whose value is a key of `urls`.
+    Keys have no leading '/'; a leading '/' in the link is kept.
+    '''
+    def sub(m):
+        attr, q, v = m.groups()
+        key = v.lstrip('/')
+        if key not in urls: return m.group(0)
+        return f'{attr}={q}{v[:len(v)-len(key)]}{urls[key]}{q}'
+    return re.sub(r'\b(' + '|'.join(link_attrs) + r')=(["\'])(.*?)\2', sub, html)
+
+
+def fingerprinted(hdrs, urls:dict):
+    '''Points local `Link`/`Script` tags in `hdrs` to their fingerprinted URLs, in place,
+    and the quoted local URLs inline scripts import (e.g. vendored MarkdownJS).
+    Returns `hdrs`.
+    '''
+    if not urls: return hdrs
+    quoted = re.compile(r'(["\'])(/?)(' + '|'.join(map(re.escape, sorted(urls, key=len, reverse=True))) + r')\1')
+    stack = [hdrs]
+    while stack:
+        o = stack.pop()
+        if isinstance(o, (tuple, list)): stack.extend(o); continue
+        for attr in ('href', 'src'):
+            v = getattr(o, 'attrs', {}).get(attr)
+            if isinstance(v, str) and v.lstrip('/') in urls:
+                o.attrs[attr] = v[:len(v)-len(v.lstrip('/'))] + urls[v.lstrip('/')]
+        cs = getattr(o, 'children', ())
+        if getattr(o, 'tag', '') == 'script' and cs and isinstance(cs[0], (str, NotStr)):
+            js = quoted.sub(lambda m: m.group(1) + m.group(2) + urls[m.group(3)] + m.group(1), str(cs[0]))
+            if js != str(cs[0]): o.children = (type(cs[0])(js), *cs[1:])
+    return hdrs
+
+
+def media_type_of(path) -> str:
+    media_type = mimetypes.guess_type(str(path))[0] or 'application/octet-stream'
+    if media_type.startswith('text/') or media_type in ('application/javascript', 'application/json'):
+        media_type += '; charset=utf-8'
+    return media_type
+
+
+#-----------------------------------------------------------------------------
+# Precompressed siblings: style/prism.js → style/prism.js.gz, style/prism.js.zst
+
+def siblings(path) -> dict:
+    '''Returns `{encoding: sibling path}` for the precompressed siblings of `path` that are up to date.
+    '''
+    try: mtime = os.stat(path).st_mtime
+    except OSError: return {}
+    out = {}
+    for enc, ext in exts.items():
+        try:
+            if os.stat(f'{path}{ext}').st_mtime >= mtime: out[enc] = f'{path}{ext}'
+        except OSError: pass
+    return out
+
+
+def write_siblings(path) -> list:
+    '''Writes a compressed sibling of `path` per available encoding (zstd, gzip),
+    unless compression doesn't make it smaller. Returns the written paths.
+    '''
+    body = Path(path).read_bytes()
+    written = []
+    for enc in encodings():
+        if enc == 'deflate': continue   # nobody needs a .zz next to a .gz
+        data = compress(body, enc)
+        if len(data) >= len(body): continue
+        Path(f'{path}{exts[enc]}').write_bytes(data)
+        written.append(f'{path}{exts[enc]}')
+    return written
+
+
+def compress_assets(root='.', patterns=('style/*', 'vendor/*')) -> list:
+    '''Build step: writes precompressed siblings of every static asset. Returns the written paths.
+    '''
+    return [o for p in find_assets(root, patterns) for o in write_siblings(Path(root)/p)]
+
+
+def file_response(path, req, headers=None):
+    '''`FileResponse` for `path`, or for its best precompressed sibling the client accepts.
+    Never compresses on the fly.
+    '''
+    sibs = siblings(path)
+    enc = negotiate(req.headers.get('accept-encoding', ''), sibs) if sibs else None
+    if enc is None: return FileResponse(path, headers=headers)
+    return FileResponse(sibs[enc], media_type=media_type_of(path),
+                        headers={**(headers or {}), 'Content-Encoding': enc, 'Vary': 'Accept-Encoding'})
+
+
+class StaticCache:
+    '''In-memory LRU of static files, bounded by total bytes.
+    Entries are re-validated against the file's mtime at most every `ttl` seconds,
+    so hot files cost no disk access at all in between.
+    Files bigger than `max_item` bytes are never cached.
+    '''
+    def __init__(self, max_bytes=8*1024*1024, max_item=None, ttl=2.0):
+        self.max_bytes, self.ttl = max_bytes, ttl
+        self.max_item = max_bytes // 4 if max_item is None else max_item
+        self.entries = OrderedDict()    # path: (Prerendered, mtime, checked_at)
+        self.size = self.hits = self.misses = self.evictions = 0
+
+    def __len__(self): return len(self.entries)
+
+    def stats(self) -> dict:
+        return dict(files=len(self.entries), bytes=self.size, max_bytes=self.max_bytes,
+                    hits=self.hits, misses=self.misses, evictions=self.evictions)
+
+    def drop(self, path):
+        entry = self.entries.pop(path, None)
+        if entry: self.size -= entry[0].nbytes
+
+    def get(self, path) -> Prerendered|None:
+        '''Returns the cached file, loading it on a miss. None if it isn't cacheable.
+        '''
+        now = time.monotonic()
+        entry = self.entries.get(path)
+        if entry:
+            rendered, mtime, checked = entry
+            if now - checked < self.ttl or self.mtime(path) == mtime:
+                self.entries[path] = (rendered, mtime, now) if now - checked >= self.ttl else entry
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return rendered
+            self.drop(path)     # changed on disk
+        self.misses += 1
+        try: st = os.stat(path)
+        except OSError: return None
+        if st.st_size > self.max_item or not os.path.isfile(path): return None
+        with open(path, 'rb') as f: body = f.read()
+        media_type = media_type_of(path)
+        variants = {}
+        for enc, sib in siblings(path).items():
+            with open(sib, 'rb') as f: variants[enc] = f.read()
+        rendered = Prerendered(body, media_type=media_type, last_modified=st.st_mtime, variants=variants)
+        self.entries[path] = (rendered, st.st_mtime, now)
+        self.size += rendered.nbytes
+        while self.size > self.max_bytes:
+            self.drop(next(iter(self.entries)))
+            self.evictions += 1
+        return rendered
+
+    @staticmethod
+    def mtime(path):
+        try: return os.stat(path).st_mtime
+        except OSError: return None
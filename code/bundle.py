@@ -0,0 +1,119 @@
+'''Bundler: concatenates and minifies local CSS (or JS) files into one content-hashed asset,
+with a source map pointing back to the original files, line by line.
+
+Minification is deliberately conservative:
+- CSS: comments and whitespace go, the whole bundle fits on one line;
+- JS: blank lines and indentation go, line breaks stay (no ASI surprises).
+'''
+import re
+from hashlib import sha256
+from json import dumps
+from pathlib import Path
+
+from .render import Prerendered, flatten
+
+b64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+string_re = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+
+
+def vlq(n:int) -> str:
+    '''Base64 VLQ, as used by source maps.
+    '''
+    n = (-n << 1) | 1 if n < 0 else n << 1
+    out = ''
+    while True:
+        digit, n = n & 31, n >> 5
+        out += b64[digit | (32 if n else 0)]
+        if not n: return out
+
+
+def mappings(segments) -> str:
+    '''Encodes `[[(gen_col, src, src_line, src_col), …] per generated line]` into a `mappings` string.
+    '''
+    prev, lines = [0, 0, 0], []
+    for line in segments:
+        col, out = 0, []
+        for gen_col, *pos in line:
+            out.append(vlq(gen_col - col) + ''.join(vlq(p - q) for p, q in zip(pos, prev)))
+            col, prev = gen_col, pos
+        lines.append(','.join(out))
+    return ';'.join(lines)
+
+
+#-----------------------------------------------------------------------------
+# Minifiers: return [(src_line, src_col, text)] for the lines worth keeping
+
+def min_css_line(s:str) -> str:
+    parts = string_re.split(s)
+    for i in range(0, len(parts), 2):    # outside of strings only
+        p = re.sub(r'\s+', ' ', parts[i])
+        parts[i] = re.sub(r'\s*([{};,>])\s*', r'\1', p)
+    return ''.join(parts).strip().replace(';}', '}')
+
+
+def min_css(css:str):
+    # Comments go first, but keep their newlines so that line numbers still match.
+    css = re.sub(r'/\*.*?\*/', lambda m: '\n' * m.group(0).count('\n'), css, flags=re.S)
+    for i, line in enumerate(css.split('\n')):
+        if (s := min_css_line(line)): yield i, len(line) - len(line.lstrip()), s
+
+
+def min_js(js:str):
+    keep_indent = '`' in js     # template literals: indentation may be content
+    for i, line in enumerate(js.split('\n')):
+        s = line.rstrip() if keep_indent else line.strip()
+        if s.strip(): yield i, 0 if keep_indent else len(line) - len(line.lstrip()), s
+
+
+#-----------------------------------------------------------------------------
+
+class Bundle:
+    '''Minified concatenation of `paths` (all .css or all .js), with its source map.
+    `url` and `map_url` carry the content hash: style/bundle.css → style/bundle.3f9a1c2b.css
+    `files` maps both URLs to their `Prerendered` response.
+    '''
+    def __init__(self, paths, name, root='.', compress=False):
+        self.paths, self.kind = list(paths), Path(name).suffix
+        code, segments = [], []
+        for src, path in enumerate(self.paths):
+            text = (Path(root)/path).read_text()
+            for line, col, s in (min_css if self.kind == '.css' else min_js)(text):
+                if self.kind == '.css':     # one line: keep a space where a newline separated two words
+                    if code and code[-1][-1] not in '{};,>(' and s[0] not in '{};,>)': code[-1] += ' '
+                    if not segments: segments.append([])
+                    segments[0].append((len(''.join(code)), src, line, col))
+                    code.append(s)
+                else:
+                    segments.append([(0, src, line, col)])
+                    code.append(s)
+            if self.kind == '.js':      # files that don't end with a semicolon
+                code.append(';'); segments.append([])
+        code = ''.join(code) if self.kind == '.css' else '\n'.join(code)
+        h = sha256(code.encode()).hexdigest()[:8]
+        p = Path(name)
+        self.url = p.with_name(f'{p.stem}.{h}{p.suffix}').as_posix()
+        self.map_url = self.url + '.map'
+        comment = f'/*# sourceMappingURL=/{self.map_url} */'
+        self.code = (code + '\n' + comment).encode()
+        self.map = dumps(dict(
+            version=3, file=Path(self.url).name,
+            sources=['/' + p for p in self.paths], names=[],
+            mappings=mappings(segments),
+        )).encode()
+        media_type = 'text/css; charset=utf-8' if self.kind == '.css' else 'text/javascript; charset=utf-8'
+        self.files = {
+            self.url: Prerendered(self.code, media_type=media_type, compress=compress),
+            self.map_url: Prerendered(self.map, media_type='application/json', compress=compress),
+        }
+
+    def __len__(self): return len(self.code)
+
+
+def bundled(hdrs, items, tag) -> list:
+    '''Returns `hdrs` with `tag` in place of the first of `items`, and without the others.
+    '''
+    out = []
+    for o in flatten(hdrs):
+        if not any(o is i for i in items): out.append(o)
+        elif tag is not None: out.append(tag); tag = None
+    return out
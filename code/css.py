@@ -0,0 +1,186 @@
+'''Minimal CSS tooling: split a stylesheet into rules, and purge the rules a page can't use.
+
+Selectors are matched loosely: a selector is kept if every tag, class, id and attribute it
+mentions is used *somewhere* in the page. Structure (descendants, siblings…) is ignored,
+so purging only ever keeps too much, never too little.
+'''
+import re
+from html.parser import HTMLParser
+
+from fasthtml.common import NotStr
+
+# Set or changed at runtime by JS/HTMX: never purge selectors on these.
+dynamic_attrs = {'data-theme', 'open', 'aria-busy', 'aria-expanded', 'aria-current',
+                 'aria-invalid', 'aria-selected', 'aria-checked', 'aria-hidden', 'disabled'}
+always_tags = {'html', 'head', 'body'}
+# At-rules whose block holds rules (purged recursively); others (@font-face, @keyframes…) are kept as is.
+nested_at = {'media', 'supports', 'layer', 'container', 'document'}
+
+
+class Used:
+    '''Tags, classes, ids and attributes used by a page.
+    '''
+    def __init__(self):
+        self.tags, self.classes, self.ids = set(always_tags), set(), set()
+        self.attrs, self.values = set(), set()     # names; (name, value) pairs
+
+    def add(self, tag, attrs:dict):
+        self.tags.add(tag.lower())
+        for k, v in attrs.items():
+            k = k.lower()
+            self.attrs.add(k)
+            if v is None or v is False: continue
+            v = str(v)
+            if k == 'class': self.classes.update(v.split())
+            elif k == 'id': self.ids.add(v)
+            self.values.add((k, v))
+
+    def add_ft(self, *c):
+        '''Walks FT trees (tags, tuples of tags…), and the raw HTML they hold (e.g. highlighted code).
+        '''
+        stack = list(c)
+        while stack:
+            o = stack.pop()
+            if isinstance(o, (tuple, list)): stack.extend(o); continue
+            if isinstance(o, NotStr): self.add_html(str(o)); continue
+            if not hasattr(o, 'tag'): continue
+            self.add(o.tag, o.attrs)
+            stack.extend(o.children)
+        return self
+
+    def add_html(self, *html):
+        '''Scans raw HTML strings (e.g. `render_modal()`).
+        '''
+        used = self
+        class Parser(HTMLParser):
+            def handle_starttag(self, tag, attrs): used.add(tag, dict(attrs))
+        for h in html: Parser().feed(h)
+        return self
+
+
+#-----------------------------------------------------------------------------
+# Parsing
+
+def strip_comments(css:str) -> str:
+    return re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+
+
+def blocks(css:str):
+    '''Yields `(prelude, body)` for each top-level rule of `css`. Statements (`@import …;`) have `body=None`.
+    '''
+    css = strip_comments(css)
+    i, n, start = 0, len(css), 0
+    while i < n:
+        c = css[i]
+        if c in '"\'':
+            i = css.find(c, i+1) + 1 or n
+            continue
+        if c == ';':
+            if css[start:i].strip(): yield css[start:i].strip(), None
+            start = i + 1
+        elif c == '{':
+            depth, j = 1, i + 1
+            while j < n and depth:
+                if css[j] in '"\'': j = css.find(css[j], j+1) + 1 or n; continue
+                depth += {'{': 1, '}': -1}.get(css[j], 0)
+                j += 1
+            yield css[start:i].strip(), css[i+1:j-1]
+            i = start = j
+            continue
+        elif c == '}': start = i + 1    # stray
+        i += 1
+
+
+def split_top(s:str, sep=',') -> list:
+    '''Splits `s` on `sep`, outside of parentheses, brackets and strings.
+    '''
+    out, depth, cur, q = [], 0, [], None
+    for c in s:
+        if q:
+            if c == q: q = None
+        elif c in '"\'': q = c
+        elif c in '([': depth += 1
+        elif c in ')]': depth -= 1
+        elif c == sep and not depth:
+            out.append(''.join(cur).strip()); cur = []
+            continue
+        cur.append(c)
+    if ''.join(cur).strip(): out.append(''.join(cur).strip())
+    return out
+
+
+#-----------------------------------------------------------------------------
+# Purging
+
+attr_re = re.compile(r'\[\s*([\w-]+)\s*(?:([~|^$*]?=)\s*("[^"]*"|\'[^\']*\'|[^\]\s]*))?\s*([iIsS]?)\s*\]')
+# [name op "value"]: does an actual value match?
+attr_ops = {
+    '=':  lambda a, v: a == v,
+    '~=': lambda a, v: v in a.split(),
+    '|=': lambda a, v: a == v or a.startswith(v + '-'),
+    '^=': lambda a, v: bool(v) and a.startswith(v),
+    '$=': lambda a, v: bool(v) and a.endswith(v),
+    '*=': lambda a, v: bool(v) and v in a,
+}
+
+
+def requirements(sel:str):
+    '''Returns `(tags, classes, ids, attrs)` mentioned by a selector;
+    `attrs` is a list of (name, operator|None, value|None, case-insensitive).
+    Arguments of functional pseudo-classes (:not(), :is(), :where()…) are ignored.
+    '''
+    while True:
+        s = re.sub(r':{1,2}[\w-]+\([^()]*\)', '', sel)
+        if s == sel: break
+        sel = s
+    attrs = [(k.lower(), op or None, v.strip('"\'') if op else None, flag.lower() == 'i') for k, op, v, flag in attr_re.findall(sel)]
+    sel = attr_re.sub('', sel)
+    sel = re.sub(r':{1,2}[\w-]+', '', sel)
+    classes = re.findall(r'\.((?:[\w-]|\\.)+)', sel)
+    ids = re.findall(r'#((?:[\w-]|\\.)+)', sel)
+    tags = [t.lower() for t in re.findall(r'(?:^|[\s>+~(])([a-zA-Z][\w-]*)', sel)]
+    return tags, classes, ids, attrs
+
+
+def attr_used(used:Used, k, op, v, nocase=False) -> bool:
+    '''True if an attribute `k` of the page matches `[k op "v"]` (`^=` prefix, `*=` substring, `~=` word…).
+    '''
+    if op == '=' and not nocase: return (k, v) in used.values
+    if nocase: v = v.lower()
+    return any(attr_ops[op](a.lower() if nocase else a, v) for name, a in used.values if name == k)
+
+
+def keeps(sel:str, used:Used) -> bool:
+    tags, classes, ids, attrs = requirements(sel)
+    if any(t not in used.tags for t in tags): return False
+    if any(c.replace('\\', '') not in used.classes for c in classes): return False
+    if any(i not in used.ids for i in ids): return False
+    for k, op, v, nocase in attrs:
+        if k in dynamic_attrs: continue
+        if k not in used.attrs: return False
+        if op and k != 'class' and not attr_used(used, k, op, v, nocase): return False
+    return True
+
+
+def purge(css:str, used:Used) -> str:
+    '''Returns `css` without the rules (and selectors) that can't match anything in `used`.
+    '''
+    out = []
+    for prelude, body in blocks(css):
+        if body is None: out.append(prelude + ';')
+        elif prelude.startswith('@'):
+            name = re.match(r'@([\w-]+)', prelude).group(1).lower()
+            if name in nested_at:
+                inner = purge(body, used)
+                if inner: out.append(f'{prelude}{{{inner}}}')
+            else: out.append(f'{prelude}{{{body}}}')
+        else:
+            sels = [s for s in split_top(prelude) if keeps(s, used)]
+            if sels: out.append(','.join(sels) + '{' + body + '}')
+    return ''.join(out)
+
+
+def critical(css:str, *c) -> str:
+    '''Returns the rules of `css` needed to render the FT trees `c` (e.g. what's above the fold).
+    '''
+    return purge(css, Used().add_ft(*c))
@@ -0,0 +1,68 @@
+'''Content-Encoding helpers: compress once, pick per request.
+
+zstd needs the optional `zstandard` package; without it we fall back to deflate.
+'''
+import gzip
+import zlib
+
+try: import zstandard
+except ImportError: zstandard = None
+
+# Best first: used to break ties between equally acceptable encodings.
+preferred = ('zstd', 'gzip', 'deflate')
+min_size = 256      # below this, headers cost more than compression saves
+exts = {'zstd': '.zst', 'gzip': '.gz', 'deflate': '.zz'}    # precompressed sibling files
+
+
+def compress(body:bytes, enc:str) -> bytes:
+    '''Compresses `body` with `enc` at the highest level: this runs once, not per request.
+    '''
+    if enc == 'gzip':    return gzip.compress(body, compresslevel=9, mtime=0)
+    if enc == 'deflate': return zlib.compress(body, 9)
+    if enc == 'zstd':    return zstandard.ZstdCompressor(level=19).compress(body)
+    raise ValueError(f"Unknown encoding: {enc}")
+
+
+def encodings():
+    '''Returns the encodings available in this environment, best first.
+    '''
+    return ('zstd', 'gzip') if zstandard else ('gzip', 'deflate')
+
+
+def compress_all(body:bytes) -> dict:
+    '''Returns `{encoding: bytes}` for every available encoding that actually makes `body` smaller.
+    '''
+    if len(body) < min_size: return {}
+    out = {enc: compress(body, enc) for enc in encodings()}
+    return {enc: b for enc, b in out.items() if len(b) < len(body)}
+
+
+def accepted(header:str) -> dict:
+    '''Parses an Accept-Encoding header into `{coding: qvalue}`.
+    '''
+    out = {}
+    for part in (header or '').split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        if not coding: continue
+        q = 1.0
+        for p in params:
+            if p.startswith('q='):
+                try: q = float(p[2:])
+                except ValueError: q = 0.0
+        out[coding.lower()] = q
+    return out
+
+
+def negotiate(header:str, available) -> str|None:
+    '''Returns the best encoding in `available` the client accepts, or None for identity.
+    '''
+    acc = accepted(header)
+    star = acc.get('*', 0.0)
+    best, best_q = None, 0.0
+    for enc in preferred:
+        if enc not in available: continue
+        q = acc.get(enc, star)
+        if q > best_q: best, best_q = enc, q
+    if best is None: return None
+    # Identity wins if the client explicitly prefers it.
+    return None if acc.get('identity', 0.0) > best_q else best
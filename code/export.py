@@ -0,0 +1,43 @@
+'''Static site export: everything the app serves, as plain files for a CDN or nginx.
+'''
+import shutil
+from pathlib import Path
+
+from .assets import find_assets, manifest, rewrite_links
+
+
+asset_exts = ('.css', '.js', '.map', '.json')
+
+
+def page_file(url:str) -> str:
+    '''Returns the file a route is exported to: `/` → `index.html`, `/section/4.3` → `section/4.3.html`.
+    Assets (e.g. bundles, the search index) keep their URL.
+    '''
+    url = url.strip('/')
+    if url.endswith(asset_exts): return url
+    return url + '.html' if url else 'index.html'
+
+
+def export(dist, pages:dict, root='.', assets=None) -> list:
+    '''Writes `pages` (`{url: bytes}`) and fingerprinted copies of the static assets to `dist`.
+    Links between pages and to assets are rewritten to the exported file names.
+    Returns the written paths, relative to `dist`.
+    '''
+    dist, root = Path(dist), Path(root)
+    assets = find_assets(root) if assets is None else assets
+    urls = {url.strip('/'): page_file(url) for url in pages if url.strip('/')}
+    urls.update(manifest(assets, root))
+    written = []
+    for url, body in pages.items():
+        out = page_file(url)
+        (dist/out).parent.mkdir(parents=True, exist_ok=True)
+        if out.endswith(asset_exts): (dist/out).write_bytes(bytes(body))
+        else: (dist/out).write_text(rewrite_links(bytes(body).decode(), urls))
+        written.append(out)
+    for src in assets:
+        # Browsers ask for /favicon.ico by name: keep it, on top of the fingerprinted copy.
+        for out in {urls[src], src} if src == 'favicon.ico' else (urls[src],):
+            (dist/out).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(root/src, dist/out)
+            written.append(out)
+    return written
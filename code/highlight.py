@@ -0,0 +1,213 @@
+'''Server-side syntax highlighting for html, python and css: highlight.js markup, no JavaScript.
+
+Tokens get highlight.js class names (`hljs-keyword`, `hljs-tag`…), so its theme stylesheets apply as is.
+The tokenizers are small and regex based: they aim at the snippets of this site, not at every corner of each language.
+Unknown languages are only escaped.
+'''
+import builtins
+import keyword
+import re
+from hashlib import sha256
+from html import escape
+
+cache = {}      # {(sha256 of code, lang, line_numbers): highlighted HTML}
+
+
+def span(cls:str, s:str) -> str: return f'<span class="{cls}">{s}</span>'
+
+def esc(s:str) -> str: return escape(s, quote=False)
+
+
+#-----------------------------------------------------------------------------
+# Python
+
+py_re = re.compile(r'''
+ (?P<comment>\#[^\n]*)
+|(?P<string>[rRbBfFuU]{0,2}(?:"""[\s\S]*?(?:"""|\Z)|\'\'\'[\s\S]*?(?:\'\'\'|\Z)|"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?))
+|(?P<meta>^[ \t]*@[\w.]+)
+|(?P<number>\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?j?)\b)
+|(?P<word>[A-Za-z_]\w*)
+''', re.X | re.M)
+py_literals = {'True', 'False', 'None'}
+py_keywords = (set(keyword.kwlist) | set(keyword.softkwlist) | {'self'}) - py_literals - {'_'}
+py_builtins = {k for k in dir(builtins) if not k.startswith('_') and not k[0].isupper()}
+
+
+def python(code:str) -> str:
+    out, i, prev = [], 0, None
+    for m in py_re.finditer(code):
+        out.append(esc(code[i:m.start()]))
+        kind, s = m.lastgroup, m.group()
+        if kind == 'word':
+            if prev in ('def', 'class'): out.append(span('hljs-title ' + ('function_' if prev == 'def' else 'class_'), s))
+            elif s in py_literals:       out.append(span('hljs-literal', s))
+            elif s in py_keywords:       out.append(span('hljs-keyword', s))
+            elif s in py_builtins:       out.append(span('hljs-built_in', s))
+            else: out.append(s)
+            prev = s
+        else:
+            if kind == 'meta':      # keep the indentation out of the span
+                out.append(esc(s[:len(s) - len(s.lstrip())])); s = s.lstrip()
+            out.append(span('hljs-' + kind, esc(s)))
+            prev = None
+        i = m.end()
+    out.append(esc(code[i:]))
+    return ''.join(out)
+
+
+#-----------------------------------------------------------------------------
+# CSS
+
+css_re = re.compile(r'(?P<comment>/\*[\s\S]*?(?:\*/|\Z))|(?P<string>"(?:\\.|[^"\\])*"?|\'(?:\\.|[^\'\\])*\'?)|(?P<delim>[{};])')
+selector_re = re.compile(r'''
+ (?P<cls>\.-?[_a-zA-Z][\w-]*)
+|(?P<id>\#[\w-]+)
+|(?P<pseudo>::?[\w-]+)
+|(?P<attr>\[[^\]]*\])
+|(?P<tag>(?<![\w-])(?:[a-zA-Z][\w-]*|\*))
+''', re.X)
+selector_cls = {'cls': 'hljs-selector-class', 'id': 'hljs-selector-id', 'pseudo': 'hljs-selector-pseudo',
+                'attr': 'hljs-selector-attr', 'tag': 'hljs-selector-tag'}
+value_re = re.compile(r'''
+ (?P<number>(?<![\w-])(?:\#[\da-fA-F]{3,8}\b|[-+]?\d*\.?\d+(?:%|[a-zA-Z]+)?))
+|(?P<meta>!important)
+|(?P<built_in>[\w-]+(?=\())
+''', re.X)
+nested_at = ('@media', '@supports', '@layer', '@container', '@document')
+
+
+def sub(regex, classes, s:str) -> str:
+    '''Escapes `s`, wrapping each named-group match of `regex` in a span (`classes`: group name → class).
+    '''
+    out, i = [], 0
+    for m in regex.finditer(s):
+        out += [esc(s[i:m.start()]), span(classes.get(m.lastgroup, 'hljs-' + m.lastgroup), esc(m.group()))]
+        i = m.end()
+    return ''.join(out) + esc(s[i:])
+
+
+def css_prelude(s:str) -> str:
+    m = re.match(r'(\s*)(@[\w-]+)([\s\S]*)', s)
+    if m: return esc(m.group(1)) + span('hljs-keyword', esc(m.group(2))) + sub(value_re, {}, m.group(3))
+    return sub(selector_re, selector_cls, s)
+
+
+def css_decl(s:str) -> str:
+    m = re.match(r'(\s*)([\w-]+)(\s*:)([\s\S]*)', s)
+    if not m: return esc(s)
+    cls = 'hljs-attr' if m.group(2).startswith('--') else 'hljs-attribute'
+    return esc(m.group(1)) + span(cls, m.group(2)) + esc(m.group(3)) + sub(value_re, {}, m.group(4))
+
+
+def css(code:str) -> str:
+    '''Selectors in rule blocks, declarations in style blocks; `@media` & co. open rule blocks again.
+    '''
+    out, seg, stack = [], [], ['rules']
+    def flush(end):
+        # A segment is text and strings up to a delimiter: a prelude before `{`, a declaration otherwise.
+        text = ''.join('\ue000' if k == 'string' else s for k, s in seg)     # strings: placeholders
+        if end == '{': html = css_prelude(text)
+        elif stack[-1] == 'decls' and ':' in text: html = css_decl(text)
+        elif text.lstrip().startswith('@'): html = css_prelude(text)
+        else: html = esc(text)
+        for k, s in seg:
+            if k == 'string': html = html.replace('\ue000', span('hljs-string', esc(s)), 1)
+        out.append(html); seg.clear()
+    i = 0
+    for m in css_re.finditer(code):
+        if m.start() > i: seg.append(('text', code[i:m.start()]))
+        kind, s = m.lastgroup, m.group()
+        if kind == 'comment':
+            flush(None); out.append(span('hljs-comment', esc(s)))
+        elif kind == 'string': seg.append(('string', s))
+        else:
+            if s == '{':
+                prelude = ''.join(x for k, x in seg).strip()
+                flush('{'); stack.append('rules' if prelude.startswith(nested_at) else 'decls')
+            else:
+                flush(s)
+                if s == '}' and len(stack) > 1: stack.pop()
+            out.append(s)
+        i = m.end()
+    if i < len(code): seg.append(('text', code[i:]))
+    flush(None)
+    return ''.join(out)
+
+
+#-----------------------------------------------------------------------------
+# HTML
+
+html_re = re.compile(r'''
+ (?P<comment><!--[\s\S]*?(?:-->|\Z))
+|(?P<meta><!DOCTYPE[^>]*>)
+|(?P<tag></?[A-Za-z][\w-]*(?:\s+[^\s=>/"']+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>"']+))?)*\s*/?>)
+''', re.X | re.I)
+attr_re = re.compile(r'''(\s+)([^\s=>/"']+)(?:(\s*=\s*)("[^"]*"|'[^']*'|[^\s>"']+))?''')
+
+
+def tag(s:str) -> str:
+    m = re.match(r'(</?)([\w-]+)([\s\S]*?)(\s*/?>)$', s)
+    opening, name, attrs, closing = m.groups()
+    out = [esc(opening), span('hljs-name', name)]
+    i = 0
+    for a in attr_re.finditer(attrs):
+        out += [esc(attrs[i:a.start()]), a.group(1), span('hljs-attr', esc(a.group(2)))]
+        if a.group(4): out += [a.group(3), span('hljs-string', esc(a.group(4)))]
+        i = a.end()
+    out += [esc(attrs[i:]), esc(closing)]
+    return span('hljs-tag', ''.join(out))
+
+
+def html(code:str) -> str:
+    '''Tags, attributes, comments; the content of <style> is highlighted as css.
+    '''
+    out, i = [], 0
+    for m in html_re.finditer(code):
+        if m.start() < i: continue      # inside a <style> already handled
+        out.append(esc(code[i:m.start()]))
+        kind, s = m.lastgroup, m.group()
+        out.append(tag(s) if kind == 'tag' else span('hljs-' + kind, esc(s)))
+        i = m.end()
+        if kind == 'tag' and re.match(r'<style\b', s, re.I):
+            end = re.compile(r'</style\s*>', re.I).search(code, i)
+            stop = end.start() if end else len(code)
+            out.append(css(code[i:stop])); i = stop
+    out.append(esc(code[i:]))
+    return ''.join(out)
+
+
+#-----------------------------------------------------------------------------
+
+# Line numbers
+
+def numbered(html:str) -> str:
+    '''Wraps each line of highlighted `html` in `<span class="ln">`, numbered by a CSS counter.
+    Token spans crossing a line break (docstrings, comments) are closed and reopened around it.
+    A single line gets a plain `<span>`, like the highlightjs-line-numbers plugin leaves one-liners unnumbered.
+    '''
+    html = html.strip('\n')
+    if '\n' not in html: return f'<span>{html}</span>'
+    out, opened = ['<span class="ln">'], []
+    for part in re.split(r'(<span[^>]*>|</span>|\n)', html):
+        if part == '\n': out += ['</span>' * len(opened), '</span>\n<span class="ln">', *opened]
+        elif part.startswith('<span'): opened.append(part); out.append(part)
+        elif part == '</span>': opened.pop(); out.append(part)
+        else: out.append(part)
+    out.append('</span>')
+    return ''.join(out)
+
+
+#-----------------------------------------------------------------------------
+
+languages = {'python': python, 'py': python, 'css': css, 'html': html, 'xml': html}
+
+
+def highlight(code:str, lang:str|None, line_numbers=False) -> str:
+    '''Returns `code` as escaped HTML with highlight.js spans (and numbered lines),
+    memoized by (code hash, lang, line_numbers).
+    '''
+    key = (sha256(code.encode()).hexdigest(), lang, line_numbers)
+    if key not in cache:
+        out = cache[key[:2] + (False,)] if key[:2] + (False,) in cache else languages.get(lang, esc)(code)
+        cache[key] = numbered(out) if line_numbers else out
+    return cache[key]
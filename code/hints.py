@@ -0,0 +1,66 @@
+'''Preload hints derived from the app's hdrs: `Link: rel=preload` headers, and 103 Early Hints
+where the server supports them (ASGI `http.response.early_hint` extension, e.g. Hypercorn).
+
+Either way the browser starts fetching stylesheets and scripts before it parses the HTML.
+'''
+import re
+from urllib.parse import quote
+
+from fasthtml.common import NotStr
+
+import_re = re.compile(r'''\bfrom\s*["']([^"']+)["']|\bimport\s*\(?\s*["']([^"']+)["']''')
+
+
+def url_of(url:str) -> str:
+    '''Hdrs use page-relative URLs (`style/x.css`); the only page is `/`, so they're root-relative.
+    Percent-encoded, as `Link` header URLs can't hold spaces (`style/single-page copy.css`).
+    '''
+    url = url if re.match(r'^([a-z]+:)?//|^/', url) else '/' + url
+    return quote(url, safe=":/?#[]@!$&'()*+,;=%")
+
+
+def preload_links(hdrs) -> list:
+    '''Returns `Link` header values for the stylesheets and scripts in `hdrs`, in document order.
+    Media-dependent stylesheets (e.g. dark theme only) and <noscript> fallbacks are skipped.
+    '''
+    out, stack = [], [hdrs]
+    while stack:
+        o = stack.pop(0)
+        if isinstance(o, (tuple, list)): stack[:0] = o; continue
+        tag, attrs = getattr(o, 'tag', ''), getattr(o, 'attrs', {})
+        if tag == 'link' and attrs.get('href') and not attrs.get('media'):
+            rel = attrs.get('rel')
+            if rel == 'stylesheet': out.append(f'<{url_of(attrs["href"])}>; rel=preload; as=style')
+            elif rel in ('preload', 'modulepreload'):
+                kind = attrs.get('as')
+                out.append(f'<{url_of(attrs["href"])}>; rel={rel}' + (f'; as={kind}' if kind else ''))
+        elif tag == 'script':
+            module = attrs.get('type') == 'module'
+            if attrs.get('src'):
+                out.append(f'<{url_of(attrs["src"])}>; rel=modulepreload' if module else f'<{url_of(attrs["src"])}>; rel=preload; as=script')
+            # Inline module scripts import from elsewhere (MarkdownJS, SortableJS): fetched late otherwise.
+            cs = getattr(o, 'children', ())
+            if module and cs and isinstance(cs[0], (str, NotStr)):
+                out += [f'<{url_of(a or b)}>; rel=modulepreload' for a, b in import_re.findall(str(cs[0]))]
+    return list(dict.fromkeys(out))
+
+
+class EarlyHints:
+    '''ASGI middleware: for the paths in `links` (`{path: [Link header values]}`),
+    sends a 103 Early Hints first when the server allows it, and adds the `Link` header to the response.
+    `links` can be filled after the app is created, once its hdrs are final.
+    '''
+    def __init__(self, app, links=None):
+        self.app, self.links = app, links if links is not None else {}
+
+    async def __call__(self, scope, receive, send):
+        links = self.links.get(scope['path']) if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') else None
+        if not links: return await self.app(scope, receive, send)
+        if 'http.response.early_hint' in scope.get('extensions', {}):
+            await send({'type': 'http.response.early_hint', 'links': [l.encode() for l in links]})
+        header = (b'link', ', '.join(links).encode())
+        async def send_with_link(message):
+            if message['type'] == 'http.response.start':
+                message = {**message, 'headers': [*message.get('headers', []), header]}
+            await send(message)
+        await self.app(scope, receive, send_with_link)
@@ -0,0 +1,180 @@
+'''Render FT trees once, serve the resulting bytes many times.
+
+Nothing on the single page changes per request, so there is no point in
+running `to_xml()` over the whole tree for every visitor.
+'''
+import re
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from hashlib import sha256
+
+from fastcore.xml import to_xml
+from fasthtml.common import Html, Head, Body, Title, NotStr
+from starlette.responses import Response
+
+from .encoding import compress_all, negotiate
+
+hdr_tags = ('title', 'meta', 'link', 'style', 'base')
+
+
+def flatten(c):
+    '''Flattens nested tuples/lists of tags, dropping `None`s.
+    '''
+    for o in c:
+        if o is None: continue
+        if isinstance(o, (tuple, list)): yield from flatten(o)
+        else: yield o
+
+
+def render_doc(*c, hdrs=(), ftrs=(), htmlkw=None, bodykw=None) -> bytes:
+    '''Returns a full HTML document, serialized the way FastHTML does it.
+    <head> tags found in `c` go to <head> after the title, before `hdrs`.
+    An `Html()` tag in `c` (e.g. `html` in main.py) only contributes its attributes.
+    '''
+    htmlkw = dict(htmlkw or {})
+    titles, bdy = [], []
+    for o in flatten(c):
+        tag = getattr(o, 'tag', '')
+        if tag == 'html': htmlkw.update(o.attrs)
+        elif tag in hdr_tags: titles.append(o)
+        else: bdy.append(o)
+    if not any(getattr(o, 'tag', '') == 'title' for o in titles): titles.insert(0, Title('FastHTML page'))
+    doc = Html(Head(*titles, *flatten(hdrs)), Body(*bdy, *flatten(ftrs), **(bodykw or {})), **htmlkw)
+    return ('<!doctype html>\n' + to_xml(doc)).encode()
+
+
+class Slot:
+    '''Content that `stream_doc()` serializes on its own, one chunk per item.
+    Anywhere in the tree, it stands in for its items when the document shell is rendered.
+    '''
+    __slots__ = ('c',)
+
+    def __init__(self, *c): self.c = c
+
+    def __ft__(self): return NotStr(f'<!--slot:{id(self)}-->')
+
+
+def walk(c):
+    '''Yields every node of a tree of tags, depth first.
+    '''
+    for o in flatten(c):
+        yield o
+        yield from walk(getattr(o, 'children', ()))
+
+
+def stream_doc(*c, app=None):
+    '''Renders the document shell around its `Slot`s once.
+    Returns a generator function yielding the document chunk by chunk:
+    slot items are only serialized when their turn comes, so the <head> goes out first.
+    '''
+    slots = {str(id(o)): o for o in walk(c) if isinstance(o, Slot)}
+    parts = re.split(r'<!--slot:(\d+)-->', render_app_doc(*c, app=app).decode())
+    def chunks():
+        for i, part in enumerate(parts):
+            if i % 2 == 0:
+                if part: yield part.encode()
+            else:
+                for o in flatten(slots[part].c): yield to_xml(o).encode()
+    return chunks
+
+
+def render_ft(*c) -> bytes:
+    '''Returns a serialized fragment (no <html>, <head> or <body>), for HTMX swaps.
+    '''
+    return to_xml(tuple(flatten(c))).encode()
+
+
+class Prerendered:
+    '''An immutable, already serialized response body with strong validators.
+    `response(req)` answers conditional GETs (If-None-Match / If-Modified-Since) with a bodyless 304.
+    With `compress=True`, gzip/zstd (or deflate) variants are built once and picked from Accept-Encoding.
+    Already compressed `variants` (`{encoding: bytes}`) can be given instead.
+    '''
+    __slots__ = ('body', 'etag', 'last_modified', 'media_type', 'variants')
+
+    def __init__(self, body:bytes, media_type='text/html; charset=utf-8', last_modified=None, compress=False, variants=None):
+        self.body = bytes(body)
+        self.etag = '"' + sha256(self.body).hexdigest()[:32] + '"'
+        self.last_modified = int(last_modified if last_modified is not None else time.time())
+        self.media_type = media_type
+        # Each encoding is a distinct representation, so it gets its own strong ETag.
+        self.variants = {enc: (b, self.etag[:-1] + '-' + enc + '"')
+                         for enc, b in (compress_all(self.body) if compress else variants or {}).items()}
+
+    def __len__(self): return len(self.body)
+
+    @property
+    def nbytes(self):
+        '''Memory held, all encodings included.
+        '''
+        return len(self.body) + sum(len(b) for b, _ in self.variants.values())
+
+    def headers(self, etag=None, enc=None):
+        hdrs = {
+            'ETag': etag or self.etag,
+            'Last-Modified': formatdate(self.last_modified, usegmt=True),
+            'Cache-Control': 'no-cache',    # always revalidate, the 304 is cheap
+        }
+        if self.variants: hdrs['Vary'] = 'Accept-Encoding'
+        if enc: hdrs['Content-Encoding'] = enc
+        return hdrs
+
+    def not_modified(self, req, etag=None) -> bool:
+        '''True if the client's cached copy is still good (RFC 9110 §13.2.2 precedence).
+        '''
+        inm = req.headers.get('if-none-match')
+        if inm is not None:
+            tags = [t.strip().removeprefix('W/') for t in inm.split(',')]
+            return '*' in tags or (etag or self.etag) in tags
+        ims = req.headers.get('if-modified-since')
+        if ims is None: return False
+        try: return self.last_modified <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError): return False
+
+    def select(self, req=None):
+        '''Returns `(body, etag, encoding)` of the best representation for `req`.
+        '''
+        enc = negotiate(req.headers.get('accept-encoding', ''), self.variants) if req is not None and self.variants else None
+        if enc is None: return self.body, self.etag, None
+        return *self.variants[enc], enc
+
+    def response(self, req=None, headers=None):
+        '''`headers` override the defaults, e.g. a longer Cache-Control.
+        '''
+        body, etag, enc = self.select(req)
+        hdrs = {**self.headers(etag, enc), **(headers or {})}
+        if req is not None and self.not_modified(req, etag):
+            return Response(status_code=304, headers=hdrs)
+        return Response(body, media_type=self.media_type, headers=hdrs)
+
+
+class FragmentCache:
+    '''Serves subtrees by key, each serialized once, on first request.
+    `kw` goes to each `Prerendered` (last_modified, compress).
+    '''
+    def __init__(self, trees:dict, **kw):
+        self.trees, self.kw, self.cache = trees, kw, {}
+
+    def __contains__(self, k): return k in self.trees
+
+    def __len__(self): return len(self.trees)
+
+    def get(self, k) -> Prerendered|None:
+        if k not in self.cache:
+            if k not in self.trees: return None
+            self.cache[k] = Prerendered(render_ft(self.trees[k]), **self.kw)
+        return self.cache[k]
+
+
+def render_app_doc(*c, app=None) -> bytes:
+    '''`render_doc()` using `app`'s hdrs/ftrs like a normal route would.
+    '''
+    if app is None: return render_doc(*c)
+    r = app.router
+    return render_doc(*c, hdrs=r.hdrs, ftrs=r.ftrs, htmlkw=r.htmlkw, bodykw=r.bodykw)
+
+
+def prerender(*c, app=None, last_modified=None, compress=False) -> Prerendered:
+    '''Serializes a whole page once.
+    '''
+    return Prerendered(render_app_doc(*c, app=app), last_modified=last_modified, compress=compress)
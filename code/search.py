@@ -0,0 +1,97 @@
+'''In-memory full-text search: an inverted index ranked with BM25, and highlighted snippets.
+
+Documents have weighted fields (e.g. a title counts more than body text): term frequencies
+are summed with their field's weight before BM25 saturation (BM25F, simplified).
+'''
+import math
+import re
+from html import escape
+
+word_re = re.compile(r'[a-z0-9]+')
+
+
+def terms(text:str) -> list:
+    return word_re.findall(text.lower())
+
+
+class Index:
+    '''`add()` documents, then `search()` them. `k1` and `b` are the usual BM25 parameters.
+    '''
+    def __init__(self, weights=None, k1=1.2, b=0.75):
+        self.weights, self.k1, self.b = weights or {}, k1, b
+        self.postings = {}      # {term: {doc: weighted term frequency}}
+        self.docs, self.lengths = [], []
+        self.avg_len = 0.0
+
+    def __len__(self): return len(self.docs)
+
+    def add(self, doc, **fields):
+        '''Indexes `fields` (`name=text`) under `doc`, which `search()` returns as is.
+        '''
+        i, tf, n = len(self.docs), {}, 0.0
+        for name, text in fields.items():
+            w = self.weights.get(name, 1.0)
+            for t in terms(text):
+                tf[t] = tf.get(t, 0.0) + w
+                n += w
+        for t, f in tf.items(): self.postings.setdefault(t, {})[i] = f
+        self.docs.append(doc); self.lengths.append(n)
+        self.avg_len = sum(self.lengths) / len(self.lengths)
+
+    def idf(self, t) -> float:
+        df = len(self.postings.get(t, ()))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def search(self, query:str, limit=10) -> list:
+        '''Returns `[(score, doc)]`, best first.
+        '''
+        scores, k1, b = {}, self.k1, self.b
+        for t in set(terms(query)):
+            idf = self.idf(t)
+            for i, f in self.postings.get(t, {}).items():
+                norm = k1 * (1 - b + b * self.lengths[i] / self.avg_len)
+                scores[i] = scores.get(i, 0.0) + idf * f * (k1 + 1) / (f + norm)
+        best = sorted(scores.items(), key=lambda x: -x[1])[:limit]
+        return [(s, self.docs[i]) for i, s in best]
+
+
+def num(x:float):
+    return int(x) if x == int(x) else round(x, 2)
+
+
+def compact(index:Index, doc=lambda d: d) -> dict:
+    '''JSON-ready copy of `index` for client-side search: `d` documents (mapped by `doc`), `n` lengths,
+    `t` postings as flat `[doc gap, tf, doc gap, tf…]` lists (gaps: small numbers, short JSON).
+    '''
+    t = {}
+    for term, p in sorted(index.postings.items()):
+        prev, flat = 0, []
+        for i in sorted(p): flat += [i - prev, num(p[i])]; prev = i
+        t[term] = flat
+    return dict(k1=index.k1, b=index.b, d=[doc(d) for d in index.docs], n=[num(n) for n in index.lengths], t=t)
+
+
+def query_re(query:str):
+    '''Regex matching the terms of `query` as whole words, or None without terms.
+    Compile it once per query, then pass it to `snippet()` for each hit.
+    '''
+    ts = set(terms(query))
+    if not ts: return None
+    return re.compile(r'(?<![a-z0-9])(' + '|'.join(map(re.escape, sorted(ts, key=len, reverse=True))) + r')(?![a-z0-9])', re.I)
+
+
+def snippet(text:str, query, width=160) -> str:
+    '''Escaped excerpt of `text` around the first query term, with every term in <mark>.
+    `query` is a string, or its `query_re()`.
+    '''
+    pat = query_re(query) if isinstance(query, str) else query
+    if pat is None: return escape(text[:width])
+    m = pat.search(text)
+    at = m.start() if m else 0
+    start = max(0, at - width // 3)
+    space = text.find(' ', start)
+    if start and 0 <= space < at: start = space + 1     # don't cut a word
+    part = text[start:start + width]
+    out = ('…' if start else '') + pat.sub(lambda m: '\0' + m.group() + '\1', part)
+    out = escape(out).replace('\0', '<mark>').replace('\1', '</mark>')
+    return out + ('…' if start + width < len(text) else '')
@@ -0,0 +1,69 @@
+'''Search-as-you-type: a prefix trie for what the user starts typing, a trigram index for the rest.
+
+"drop" finds "Dropdown" through the trie (every word of a label is a way in: "states" → "Validation states"),
+"busy" finds "aria-busy" and "tooltp" still finds "Tooltip" through shared trigrams.
+'''
+import re
+
+end = ''    # trie key of the entries ending at a node
+
+
+def trigrams(s:str) -> set:
+    s = f' {s.lower()} '
+    return {s[i:i+3] for i in range(len(s) - 2)}
+
+
+class Trie:
+    '''Nested dicts, one level per character; `end` keys hold entry ids.
+    '''
+    def __init__(self): self.root = {}
+
+    def insert(self, key:str, i:int):
+        node = self.root
+        for c in key: node = node.setdefault(c, {})
+        node.setdefault(end, []).append(i)
+
+    def find(self, prefix:str, limit:int) -> list:
+        '''Entry ids under `prefix`, shortest keys first.
+        '''
+        node = self.root
+        for c in prefix:
+            if c not in node: return []
+            node = node[c]
+        out, level = [], [node]
+        while level and len(out) < limit:     # breadth first: shortest completions first
+            out += [i for n in level for i in n.get(end, ())]
+            level = [child for n in level for k, child in n.items() if k != end]
+        return list(dict.fromkeys(out))[:limit]
+
+
+class Suggester:
+    '''`entries` are `(label, value)` pairs, e.g. ("Dropdown", "components/dropdown").
+    '''
+    def __init__(self, entries):
+        self.entries = list(dict.fromkeys(entries))
+        self.trie, self.grams = Trie(), {}
+        for i, (label, _) in enumerate(self.entries):
+            key = label.lower()
+            self.trie.insert(key, i)
+            for m in re.finditer(r'(?<=[\s\-_.:/<(])\w', key): self.trie.insert(key[m.start():], i)   # each word
+            for g in trigrams(key): self.grams.setdefault(g, set()).add(i)
+
+    def __len__(self): return len(self.entries)
+
+    def suggest(self, q:str, limit=8) -> list:
+        '''Returns up to `limit` entries: trie matches first, then the best trigram matches.
+        '''
+        q = q.strip().lower()
+        if not q: return []
+        ids = self.trie.find(q, limit)
+        if len(ids) < limit and len(q) >= 3:
+            qg = trigrams(q)
+            scores = {}
+            for g in qg:
+                for i in self.grams.get(g, ()): scores[i] = scores.get(i, 0) + 1
+            # Share at least half of the query's trigrams (Jaccard-like, favours short labels).
+            ranked = sorted((i for i, n in scores.items() if n * 2 >= len(qg) and i not in ids),
+                            key=lambda i: (-scores[i] / len(qg | trigrams(self.entries[i][0])), self.entries[i][0]))
+            ids += ranked[:limit - len(ids)]
+        return [self.entries[i] for i in ids]
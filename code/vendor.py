@@ -0,0 +1,95 @@
+'''Vendored third-party assets: pinned local copies of everything the hdrs load from CDNs.
+
+`python main.py vendor` downloads the pinned versions into `vendor/`.
+`vendored(hdrs)` then points hdrs at the local copies, so the page needs only one origin.
+Anything not downloaded yet keeps its CDN URL.
+'''
+import os
+import re
+import urllib.request
+from pathlib import Path
+
+from fasthtml.common import NotStr
+
+jsd = 'https://cdn.jsdelivr.net'
+
+# URL used in hdrs (by main.py or by FastHTML itself): (pinned source, local copy)
+pins = {
+    # main.py
+    f'{jsd}/npm/@picocss/pico@2/css/pico.pumpkin.min.css':
+        (f'{jsd}/npm/@picocss/pico@2.0.6/css/pico.pumpkin.min.css', 'vendor/pico.pumpkin.min.css'),
+    '//cdn.jsdelivr.net/npm/highlightjs-line-numbers.js@2.8.0/dist/highlightjs-line-numbers.min.js':
+        (f'{jsd}/npm/highlightjs-line-numbers.js@2.8.0/dist/highlightjs-line-numbers.min.js', 'vendor/highlightjs-line-numbers.min.js'),
+    # fasthtml.js: HighlightJS
+    f'{jsd}/gh/highlightjs/cdn-release/build/highlight.min.js':
+        (f'{jsd}/gh/highlightjs/cdn-release@11.9.0/build/highlight.min.js', 'vendor/highlight.min.js'),
+    f'{jsd}/gh/highlightjs/cdn-release/build/languages/python.min.js':
+        (f'{jsd}/gh/highlightjs/cdn-release@11.9.0/build/languages/python.min.js', 'vendor/highlight-python.min.js'),
+    f'{jsd}/gh/highlightjs/cdn-release/build/styles/atom-one-dark.css':
+        (f'{jsd}/gh/highlightjs/cdn-release@11.9.0/build/styles/atom-one-dark.css', 'vendor/atom-one-dark.css'),
+    f'{jsd}/gh/highlightjs/cdn-release/build/styles/atom-one-light.css':
+        (f'{jsd}/gh/highlightjs/cdn-release@11.9.0/build/styles/atom-one-light.css', 'vendor/atom-one-light.css'),
+    f'{jsd}/gh/arronhunt/highlightjs-copy/dist/highlightjs-copy.min.js':
+        (f'{jsd}/gh/arronhunt/highlightjs-copy@1.0.6/dist/highlightjs-copy.min.js', 'vendor/highlightjs-copy.min.js'),
+    f'{jsd}/gh/arronhunt/highlightjs-copy/dist/highlightjs-copy.min.css':
+        (f'{jsd}/gh/arronhunt/highlightjs-copy@1.0.6/dist/highlightjs-copy.min.css', 'vendor/highlightjs-copy.min.css'),
+    # fasthtml.js: MarkdownJS & SortableJS (ES module imports)
+    f'{jsd}/npm/marked/lib/marked.esm.js':
+        (f'{jsd}/npm/marked@13.0.3/lib/marked.esm.js', 'vendor/marked.esm.js'),
+    f'{jsd}/npm/sortablejs/+esm':
+        (f'{jsd}/npm/sortablejs@1.15.2/+esm', 'vendor/sortable.esm.js'),
+    # FastHTML default hdrs
+    'https://unpkg.com/htmx.org@next/dist/htmx.min.js':
+        ('https://unpkg.com/htmx.org@2.0.2/dist/htmx.min.js', 'vendor/htmx.min.js'),
+    f'{jsd}/gh/answerdotai/fasthtml-js@main/fasthtml.js':
+        (f'{jsd}/gh/answerdotai/fasthtml-js@1.0.4/fasthtml.js', 'vendor/fasthtml.js'),
+    f'{jsd}/gh/answerdotai/fasthtml-js/fasthtml.js':
+        (f'{jsd}/gh/answerdotai/fasthtml-js@1.0.4/fasthtml.js', 'vendor/fasthtml.js'),
+    f'{jsd}/gh/answerdotai/surreal@main/surreal.js':
+        (f'{jsd}/gh/answerdotai/surreal@1.3.2/surreal.js', 'vendor/surreal.js'),
+    # css-scope-inline has no releases: it stays on the CDN until pinned to a commit (`css-scope-inline@<sha>`),
+    # a copy of @main would be whatever main was on the day `vendor` ran.
+}
+
+
+def fetch(root='.', force=False) -> list:
+    '''Downloads the pinned sources into `vendor/`. Returns the paths that failed.
+    '''
+    failed = []
+    for src, dst in dict(pins.values()).items():
+        out = Path(root)/dst
+        if out.exists() and not force: continue
+        out.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with urllib.request.urlopen(src, timeout=30) as r: out.write_bytes(r.read())
+        except OSError as e:
+            print(f"{dst}: {e}")
+            failed.append(dst)
+    return failed
+
+
+def local_urls(root='.') -> dict:
+    '''Returns `{CDN URL: local URL}` for the pinned assets present in `vendor/`.
+    '''
+    return {url: '/' + dst for url, (src, dst) in pins.items() if os.path.isfile(os.path.join(root, dst))}
+
+
+def vendored(hdrs, urls:dict):
+    '''Points `hdrs` (Link href, Script src, and imports inside inline scripts) at local copies, in place.
+    Returns `hdrs`.
+    '''
+    stack = [hdrs]
+    while stack:
+        o = stack.pop()
+        if isinstance(o, (tuple, list)): stack.extend(o); continue
+        attrs = getattr(o, 'attrs', {})
+        for attr in ('href', 'src'):
+            if attrs.get(attr) in urls: attrs[attr] = urls[attrs[attr]]
+        # Inline module scripts import from CDNs too (MarkdownJS, SortableJS)
+        cs = getattr(o, 'children', ())
+        if getattr(o, 'tag', '') == 'script' and cs and isinstance(cs[0], (str, NotStr)):
+            js = str(cs[0])
+            for url, local in urls.items():
+                js = re.sub(r'(["\'])' + re.escape(url) + r'\1', lambda m: m.group(1) + local + m.group(1), js)
+            if js != str(cs[0]): o.children = (type(cs[0])(js), *cs[1:])
+    return hdrs
@@ -1,5 +1,22 @@
+import json
+import os
+import re
+from functools import lru_cache
+from hashlib import sha256
+from html import unescape
 from fasthtml.common import * # type: ignore
 from fasthtml.js import MarkdownJS, SortableJS, HighlightJS
+from starlette.responses import StreamingResponse
+from code.assets import StaticCache, compress_assets, file_response, find_assets, fingerprinted, immutable, manifest
+from code.bundle import Bundle, bundled
+from code.css import Used, critical, purge
+from code.export import export
+from code.highlight import highlight
+from code.hints import EarlyHints, preload_links
+from code.vendor import fetch, local_urls, vendored
+from code.search import Index, compact, query_re, snippet
+from code.suggest import Suggester
+from code.render import FragmentCache, Prerendered, Slot, flatten, prerender, render_app_doc, render_ft, stream_doc, walk
 #from fastapi import Request
 
 #-----------------------------------------------------------------------------
@@ -57,6 +74,39 @@ line_numbers = (
     Script(src="//cdn.jsdelivr.net/npm/highlightjs-line-numbers.js@2.8.0/dist/highlightjs-line-numbers.min.js"),
     Script("hljs.highlightAll(); hljs.initLineNumbersOnLoad({singleLine: false});")
     )
+# Alternative to highlightAll(): highlight (and number) code blocks as they near the viewport,
+# a few per idle period. Blocks in a closed <details> aren't rendered, so they wait until it opens.
+lazy_highlight = Script('''
+hljs.addPlugin(new CopyButtonPlugin());
+(function () {
+  const idle = window.requestIdleCallback || (cb => setTimeout(() => cb({timeRemaining: () => 8}), 1));
+  const queue = [];
+  let pending = false;
+  function run(deadline) {
+    pending = false;
+    while (queue.length && deadline.timeRemaining() > 1) {
+      const el = queue.shift();
+      if (el.classList.contains("hljs")) continue;
+      if (el.closest("details:not([open])")) { io.observe(el); continue; }
+      hljs.highlightElement(el);
+      if (hljs.lineNumbersBlock && el.parentElement.tagName === "PRE") hljs.lineNumbersBlock(el, {singleLine: false});
+    }
+    if (queue.length) schedule();
+  }
+  function schedule() {
+    if (!pending) { pending = true; idle(run, {timeout: 1000}); }
+  }
+  const io = new IntersectionObserver(function (entries) {
+    entries.forEach(function (e) {
+      if (e.isIntersecting) { io.unobserve(e.target); queue.push(e.target); }
+    });
+    schedule();
+  }, {rootMargin: "50% 0px"});
+  htmx.onLoad(function (elt) {
+    elt.querySelectorAll(".highlight:not(.hljs)").forEach(el => io.observe(el));
+  });
+})();
+''')
 #-----------------------------------------------------------------------------
 # Page-specific
 header_text = 'FastHTML 🧡 Pico CSS'
@@ -74,24 +124,119 @@ page_css = Link(
     href="style/single-page copy.css",
     type="text/css"
     )
+# Local PrismJS build: markup, css, clike, javascript, python + line-numbers plugin
+prism_css = Link(
+    rel="stylesheet",
+    href="style/prism-python.css",
+    type="text/css"
+    )
+prism_js = Script(src="style/prism-python.js", defer=True)
+#-----------------------------------------------------------------------------
+# Serving modes
+PRERENDER = True    # serialize the home page once at import, serve cached bytes
+PRECOMPRESS = True  # also keep gzip & zstd (or deflate) variants of prerendered bytes
+STREAM = False      # without PRERENDER: stream <head>, header, then one chunk per top-level section
+LAZY = False        # ship only top-level headings, HTMX loads each section once revealed
+FINGERPRINT = True  # link local assets by content-hashed URL, served with immutable caching
+STATIC_CACHE_BYTES = 8*1024*1024    # in-memory LRU budget for static files (0: always read from disk)
+VENDOR = False      # load CDN hdrs from pinned copies in vendor/ (run `python main.py vendor` first, vendor/ isn't committed)
+PURGE_CSS = False   # use the purged Pico from `python main.py build` (needs VENDOR's Pico copy)
+CRITICAL_CSS = True # inline the CSS the header & first section need, load local stylesheets async
+BUNDLE = True       # merge local stylesheets into one minified, hashed bundle (with source map)
+SEARCH = True       # search box in the header, ranked results from /search
+CLIENT_SEARCH = False   # search in the browser from a prebuilt index asset: no /search needed (static export)
+TOC = False         # table of contents in <aside> (always served at /toc, for HTMX sidebars)
+EARLY_HINTS = True  # preload hdrs from `/`'s headers: `Link: rel=preload`, + 103 Early Hints if the server can
+# Code highlighting engine: "hljs" (highlight.js, with its copy-to-clipboard buttons), "server" (code/highlight.py,
+# no script, no copy buttons) or "prism" (local PrismJS). Overridable from the environment, e.g. by bench.py.
+HIGHLIGHTER = os.environ.get("HIGHLIGHTER", "hljs")
+highlighters = ("server", "hljs", "prism")
+if HIGHLIGHTER not in highlighters: raise ValueError(f"Unknown HIGHLIGHTER: {HIGHLIGHTER!r}, expected one of {', '.join(highlighters)}")
+LINE_NUMBERS = True     # numbered code blocks: CSS counters in the markup (server), or the engine's plugin
+LAZY_HIGHLIGHT = True   # hljs: only highlight blocks near the viewport, when idle
+#-----------------------------------------------------------------------------
+# Static assets: style/prism.js → style/prism.3f9a1c2b.js
+root = os.path.dirname(os.path.abspath(__file__))
+asset_urls = manifest(find_assets(root), root) if FINGERPRINT else {}
+fingerprints = {v: k for k, v in asset_urls.items()}
+vendor_urls = local_urls(root) if VENDOR else {}
+# Pico without the rules the page can't use, see purge_pico()
+pico_src, pico_purged = "vendor/pico.pumpkin.min.css", "vendor/pico.pumpkin.purged.css"
+if PURGE_CSS and os.path.isfile(os.path.join(root, pico_purged)):
+    vendor_urls[pico_css.attrs["href"]] = "/" + pico_purged
+static_cache = StaticCache(STATIC_CACHE_BYTES)
+
+# Bundles: local files among `bundle_css` / `bundle_js` hdrs, each merged into one request.
+# Scripts aren't bundled: inline scripts (hljs.initLineNumbersOnLoad(), me()…) need them while parsing,
+# which a single deferred bundle would break.
+bundle_css = (pico_css, page_css, prism_css) if HIGHLIGHTER == "prism" else (pico_css, page_css)
+bundle_js = ()
+
+def local_file(o):
+    url = vendor_urls.get(o.attrs.get("href") or o.attrs.get("src"), o.attrs.get("href") or o.attrs.get("src"))
+    path = (url or "").lstrip("/")
+    return path if path and os.path.isfile(os.path.join(root, path)) else None
+
+bundles, bundle_tags = {}, {}
+for name, items, tag in (("style/bundle.css", bundle_css, lambda u: Link(rel="stylesheet", href=u, type="text/css")),
+                         ("style/bundle.js", bundle_js, lambda u: Script(src=u, defer=True))):
+    items = [o for o in items if local_file(o)] if BUNDLE else []
+    if not items: continue
+    b = Bundle([local_file(o) for o in items], name, root, compress=PRECOMPRESS)
+    bundles.update(b.files)
+    bundle_tags[b.url] = (items, tag(b.url))
 #-----------------------------------------------------------------------------
 # FastHTML app
-app = FastHTML(hdrs=(
+# Server-side highlighting only needs highlight.js' theme stylesheets (the light/dark `media` ones).
+# Lazy highlighting replaces HighlightJS's highlightAll() module script and line_numbers' inline call.
+hljs_hdrs = HighlightJS('.highlight')
+if HIGHLIGHTER == "server": highlight_hdrs = [o for o in hljs_hdrs if o.tag == "link" and o.attrs.get("media")]
+elif HIGHLIGHTER == "prism": highlight_hdrs = (prism_css, prism_js)
+elif LAZY_HIGHLIGHT:        highlight_hdrs = ([o for o in hljs_hdrs if o.attrs.get("type") != "module"],
+                                              line_numbers[0] if LINE_NUMBERS else (), lazy_highlight)
+else:                       highlight_hdrs = (hljs_hdrs, line_numbers if LINE_NUMBERS else ())
+page_hdrs = (
     head,
     pico_css,
     page_css,
     MarkdownJS('.markdown'),
     SortableJS('.sortable'),
-    HighlightJS('.highlight'),
-    line_numbers,
+    highlight_hdrs,
     onload_theme,
     # theme_button_test,
     # title,
-    ))
+    )
+for items, tag in bundle_tags.values(): page_hdrs = bundled(page_hdrs, items, tag)
+app = FastHTML(hdrs=page_hdrs)
+# Every hdrs entry, FastHTML's own included, goes through the local static pipeline when possible.
+fingerprinted(vendored(app.router.hdrs, vendor_urls), asset_urls)
+early_hints = {}    # {path: Link header values}, filled once the hdrs are final (see below)
+if EARLY_HINTS: app.add_middleware(EarlyHints, links=early_hints)
 rt = app.route
 
 @rt("/{fname:path}.{ext:static}") # Serve static files
-async def get(fname:str, ext:str): return FileResponse(f'{fname}.{ext}') # type: ignore
+async def get(req, fname:str, ext:str): # type: ignore
+    fname = f'{fname}.{ext}'
+    if fname in bundles: return bundles[fname].response(req, immutable)
+    # Fingerprinted URLs never change content: cache for a year
+    hdrs = immutable if fname in fingerprints else None
+    fname = fingerprints.get(fname, fname)
+    cached = static_cache.get(fname) if STATIC_CACHE_BYTES else None
+    return cached.response(req, hdrs) if cached else file_response(fname, req, hdrs)
+
+@rt("/{fname:path}.map") # Source maps of bundles
+def get(req, fname:str): # type: ignore
+    if f'{fname}.map' not in bundles: return Response("Not found", status_code=404)
+    return bundles[f'{fname}.map'].response(req, immutable)
+
+@rt("/{fname:path}.json") # Client search index
+def get(req, fname:str): # type: ignore
+    if f'{fname}.json' not in search_files: return Response("Not found", status_code=404)
+    return search_files[f'{fname}.json'].response(req, immutable)
+
+@rt("/stats/static")
+def get(): # type: ignore
+    return JSONResponse(static_cache.stats())
 
 #-----------------------------------------------------------------------------
 # Features
@@ -132,6 +277,7 @@ def span_code(code, lang=None):
     '''
     if lang:
         cls = "inline-code highlight language-"+lang
+        if HIGHLIGHTER == "server" and isinstance(code, str): code, cls = NotStr(highlight(code, lang)), cls+" hljs"
     else:
         # cls = "inline-code highlight"
         cls = "inline-code"
@@ -143,11 +289,18 @@ def div_code(code, lang=None):
     '''
     if lang: cls='highlight language-'+lang
     else:    cls='highlight'
+    kw, pre_kw = {}, {}
+    if HIGHLIGHTER == "server" and isinstance(code, str):
+        if LINE_NUMBERS:    # gutter wide enough for the last line number
+            cls, kw['style'] = cls+' ln-code', f"--ln-digits: {len(str(code.strip(chr(10)).count(chr(10)) + 1))}"
+        code, cls = NotStr(highlight(code, lang, LINE_NUMBERS)), cls+' hljs'
+    elif HIGHLIGHTER == "prism" and LINE_NUMBERS: pre_kw['cls'] = 'line-numbers'
     return Div(
             Pre(
                 Code(code,
-                    cls=cls
+                    cls=cls, **kw
                 ),
+                **pre_kw,
             ),
             cls='code',
         )
@@ -183,8 +336,7 @@ def heading(lv:int, title:str, desc=None):
     )
 
 def aside(*aside_tags):
-    '''Returns an <aside> block. TODO: Implementation
-    `aside_tags` needs to be created (ToC) from the list of H2, H3, H4…
+    '''Returns an <aside> block, e.g. with the table of contents: `main(…, aside_tags=toc())`.
     '''
     return Aside(aside_tags)
 
@@ -201,17 +353,99 @@ def article(*c, hd=None, ft=None, card=False, **kwargs):
     return Card(*c, header=hd, footer=ft, **kwargs) if card else Article(*c, header=hd, footer=ft, **kwargs)
 
 
+class SectionNode:
+    '''A section as data: what `section()` was given, sub-sections as nodes.
+    `id` is its place in the tree (e.g. "4.3"), set by `build_registry()`.
+    `demo`, `html` & `fasthtml` are its own samples: <article>s, html/css and python code blocks.
+    `ft` keeps the rendered <section>, built once: the page, the /section fragments, the ToC, anchors and search
+    index are all derived from it at import, so nodes are read-only once the module is loaded.
+    '''
+    __slots__ = ('id', 'lv', 'title', 'desc', 'c', 'kwargs', 'children', 'demo', 'html', 'fasthtml', 'anchor', 'ft')
+
+    def __init__(self, c, lv, title, desc=None, kwargs=None):
+        self.id, self.lv, self.title, self.desc = None, lv, title, desc
+        self.c, self.kwargs = tuple(flatten(c)), kwargs or {}
+        self.children = [o for o in self.c if isinstance(o, SectionNode)]
+        self.demo, self.html, self.fasthtml = map(tuple, samples(self.c))
+        self.anchor = self.ft = None
+
+    def render(self):
+        if self.ft is None:
+            c = [o.render() if isinstance(o, SectionNode) else o for o in self.c]
+            self.ft = Section(heading(lv=self.lv, title=self.title, desc=self.desc), *c, **self.kwargs)
+        return self.ft
+
+    def __ft__(self): return self.render()
+
+def code_lang(o):
+    code = next((x for x in walk(o.children) if getattr(x, 'tag', '') == 'code'), None)
+    m = code is not None and re.search(r'language-(\w+)', code.attrs.get('class', ''))
+    return m.group(1) if m else None
+
+# Samples in a section's own content (sub-sections excluded): ([<article>], [html/css code], [python code])
+def samples(c, out=None):
+    demo, html, fasthtml = out = out or ([], [], [])
+    for o in flatten(c):
+        tag = getattr(o, 'tag', None)
+        if tag is None: continue    # text, raw HTML, sub-sections
+        if tag == 'article': demo.append(o)
+        elif tag == 'pre' or (tag == 'div' and 'code' in o.attrs.get('class', '').split()):
+            (fasthtml if code_lang(o) in ('python', 'py') else html).append(o)
+        else: samples(o.children, out)
+    return out
+
 # c: lv2_s & lv3_s contain other sections (lv3_s & lv4_s respectively);
 #    lv4_s contains c_n_m_k (tuple of HTML tags)
+# Returns a SectionNode, rendered when used as a tag; node.render() gives its <section> (e.g. `registry["4.3"]`).
 def section(*c, lv:int, title:str, desc=None, **kwargs):
-    return Section(heading(lv=lv, title=title, desc=desc), *c, **kwargs)
+    return SectionNode(c, lv, title, desc, kwargs)
 
 # We wrap all lv2 (MAIN) sections in a div with proper id and role.
 def div_lv2_s(*sections, **kwargs):
     return Div(*sections, id="content", role="document", **kwargs)
 
+# Lazy lv2 section: heading + description only, the whole section replaces it once scrolled into view.
+# Deep links (/#forms/input/disabled: from /go, search results, the ToC) would point at nothing until then,
+# so `lazy_anchors` loads the lv2 section named by the anchor's first segment, then scrolls to the anchor.
+# Title-only anchors (#disabled) only resolve through /go/disabled.
+lazy_anchors = Script('''
+(function () {
+  function reveal() {
+    const anchor = decodeURIComponent(location.hash.slice(1));
+    if (!anchor || document.getElementById(anchor)) return;
+    const top = document.getElementById(anchor.split("/")[0]), sec = top && top.closest("section");
+    const lazy = sec && sec.querySelector(":scope > [hx-get]");
+    if (!lazy) return;
+    htmx.ajax("GET", lazy.getAttribute("hx-get"), {target: sec, swap: "outerHTML"}).then(function () {
+      const el = document.getElementById(anchor);
+      if (el) el.scrollIntoView();
+    });
+  }
+  reveal();
+  window.addEventListener("hashchange", reveal);
+})();
+''')
+
+def lazy_section(sid, sec):
+    hn, desc = sec.children[:2]
+    return Section(
+        hn, desc,
+        Div(
+            aria_busy="true",   # Pico spinner while loading
+            hx_get=f"/section/{sid}",
+            hx_trigger="revealed",
+            hx_target="closest section",
+            hx_swap="outerHTML",
+        ),
+    )
+
 # Create <main> with flat lv2 (MAIN) sections. Optional aside etc.
-def main(*lv2_s, aside_tags=None, **kwargs):
+# lazy=True: lv2 sections are numbered from 1 and served by /section/{sid}
+# slot=True: lv2 sections go in a Slot, serialized one by one by stream_doc()
+def main(*lv2_s, aside_tags=None, lazy=False, slot=False, **kwargs):
+    lv2_s = [s.render() if isinstance(s, SectionNode) else s for s in flatten(lv2_s)]
+    if lazy: lv2_s = [lazy_section(str(i), s) for i, s in enumerate(flatten(lv2_s), 1)]
+    if slot: lv2_s = [Slot(*lv2_s)]
     return (
         Main(
             aside(aside_tags) if aside_tags else None,
@@ -4559,10 +4793,29 @@ sections = (
     sec_7_0_0,
 )
 
+#-----------------------------------------------------------------------------
+# Section registry: every node of the `sections` tree, by id.
+# Ids are positions in the tree: "4" (Components), "4.3" (its 3rd sub-section, Button), "4.3.2"…
+def build_registry(nodes, prefix=""):
+    registry = {}
+    for i, node in enumerate(nodes, 1):
+        sid = node.id = f"{prefix}{i}"
+        registry[sid] = node
+        registry.update(build_registry(node.children, sid + "."))
+    return registry
+
+registry = build_registry(sections)
+
+
 # Global top header, fixed & translucent
 
 # test = Hgroup(H1('Pico'), P('Conditional Styling'))
 
+# Server search through HTMX, or client search (data-index is set once the index is built, see below)
+if CLIENT_SEARCH: search_box = Input(type="search", name="q", id="search", placeholder="Search", aria_label="Search")
+else: search_box = Input(type="search", name="q", placeholder="Search", aria_label="Search",
+                         hx_get="/search", hx_trigger="input changed delay:150ms, search", hx_target="#search-results")
+
 top_header = Header(
   Div(
     A(H1(header_text), href="/"), 
@@ -4573,9 +4826,11 @@ top_header = Header(
           Li(A("Code",  href="https://github.com/agenkit/demo-fasthtml-picocss/", target="_blank", cls="contrast")),
       ), 
       Ul(
+          Li(search_box) if SEARCH else None,
           Li(theme_toggle()),
       ),
     ), 
+    Div(id="search-results") if SEARCH else None,
     cls="container",  # use this class to add left-right margins + centering of blocks
   ), 
   cls="top-header",   # specific class → fixed above + translucent
@@ -4583,17 +4838,329 @@ top_header = Header(
 
 bottom_footer = Footer(Div(footer_text, cls="container"))
 
-page = (title, html, top_header, main(sections), bottom_footer)
+# Critical CSS: pico_css & page_css rules needed above the fold go inline in <head>,
+# the full stylesheets then load without blocking first paint.
+# Only stylesheets with a local copy (style/, vendor/) can be inlined.
+def async_css(link):
+    href = link.attrs["href"]
+    return (
+        Link(rel="preload", href=href, onload="this.onload=null;this.rel='stylesheet'", **{"as": "style"}),
+        Noscript(link),
+    )
+
+def local_css(o):
+    href = o.attrs.get("href", "").lstrip("/")
+    if href in bundles and href.endswith(".css"): return bundles[href].body.decode()
+    if o is not pico_css and o is not page_css: return None
+    path = fingerprints.get(href, href)
+    if not os.path.isfile(os.path.join(root, path)): return None
+    with open(os.path.join(root, path)) as f: return f.read()
+
+def critical_hdrs(hdrs, *above_fold):
+    out, css = [], []
+    for o in hdrs:
+        src = local_css(o) if getattr(o, "tag", "") == "link" else None
+        if src is None:
+            out.append(o)
+            continue
+        css.append(critical(src, *above_fold))
+        if len(css) == 1: out.append(None)     # <style> goes where the first stylesheet was
+        out.append(async_css(o))
+    if css: out[out.index(None)] = Style(NotStr("".join(css)))
+    return out
+
+if CRITICAL_CSS: app.router.hdrs[:] = critical_hdrs(app.router.hdrs, title, top_header, main(sec_1_0_0))
+if EARLY_HINTS: early_hints["/"] = preload_links(app.router.hdrs)
+
+#-----------------------------------------------------------------------------
+# Anchors: heading() only knows its own title, so ids repeat ("Syntax", "Disabled"…).
+# One pass over `sections` gives each heading its path of titles instead, e.g. forms/input/disabled.
+anchors = {}        # {anchor: section}
+legacy_anchors = {} # {title-only anchor: first path anchor}, what old #links pointed at
+title_paths = {}    # {path of titles: anchor}, where a suffix made them differ (content → content-2, content/button…)
+
+def is_anchor_link(o): return getattr(o, 'tag', '') == 'a' and o.attrs.get('tabindex') == '-1'
+
+# Ids anchors must not collide with: everything but the headings' own links (div#content…)
+taken = {o.attrs['id'] for o in walk((top_header, main(sections), bottom_footer))
+         if 'id' in getattr(o, 'attrs', {}) and not is_anchor_link(o)}
+
+def slug(title):
+    return re.sub(r'[^a-z0-9]+', '-', str(title).lower()).strip('-')
+
+# The heading's link points at the node's anchor; its title-only id moves to the heading, where it's still free.
+def link_heading(node):
+    hn = node.ft.children[0]
+    a = hn.children[-1]
+    legacy = a.attrs['id']
+    if legacy != node.anchor and legacy_anchors.get(legacy) == node.anchor: hn.attrs['id'] = legacy
+    a.attrs.update(href='#'+node.anchor, id=node.anchor, name=node.anchor)
+
+# Sub-sections' anchors extend their parent's, suffix included: content-2/button.
+def set_anchors(nodes, path=(), titles=()):
+    for node in nodes:
+        o = node.render()
+        t = (*titles, slug(node.title))
+        p = (*path, t[-1])
+        anchor, n = '/'.join(p), 2
+        while anchor in anchors or anchor in taken: anchor, n = f"{'/'.join(p)}-{n}", n + 1
+        anchors[anchor] = o
+        if anchor != '/'.join(t): title_paths.setdefault('/'.join(t), anchor)
+        node.anchor = anchor
+        legacy = o.children[0].children[-1].attrs['id']
+        if legacy not in legacy_anchors and legacy not in taken:    # keep old deep links working
+            legacy_anchors[legacy] = anchor
+        link_heading(node)
+        set_anchors(node.children, tuple(anchor.split('/')), t)
+
+set_anchors(sections)
+
+#-----------------------------------------------------------------------------
+# Table of contents: lv2–lv4 headings with their anchors.
+# Entries are cached per lv2 section: adding a section only builds its own.
+toc_levels = ('h2', 'h3', 'h4')
+toc_cache = {}      # {lv2 anchor: [Li]}
+
+def sub_sections(c):
+    for o in c:
+        if getattr(o, 'tag', '') == 'section': yield o
+        else: yield from sub_sections(getattr(o, 'children', ()))
+
+def toc_items(sec):
+    hn = sec.children[0]
+    subs = [li for o in sub_sections(sec.children[1:]) for li in toc_items(o)]
+    if hn.tag not in toc_levels: return subs
+    return [Li(A(hn.children[0], href=hn.children[-1].attrs['href']), Ul(*subs) if subs else None)]
+
+def toc_entry(sec):
+    anchor = sec.children[0].children[-1].attrs['id']
+    if anchor not in toc_cache: toc_cache[anchor] = toc_items(sec)
+    return toc_cache[anchor]
+
+def toc(secs=sections):
+    return Nav(Ul(*[li for sec in secs for li in toc_entry(sec.render())]), aria_label="Table of contents", cls="toc")
+
+#-----------------------------------------------------------------------------
+# Search: one document per section (own content, not its sub-sections), BM25 ranked
+def section_text(c, text, code):
+    for o in c:
+        if isinstance(o, NotStr): text.append(unescape(re.sub(r'<[^>]+>', '', str(o))))
+        elif isinstance(o, str): text.append(o)
+        elif getattr(o, 'tag', '') in ('section', 'script', 'style'): continue
+        elif getattr(o, 'tag', '') == 'pre': section_text(o.children, code, code)
+        else: section_text(getattr(o, 'children', ()), text, code)
+    return text, code
+
+search_index = Index(weights={"title": 3, "text": 1, "code": 0.5})
+for anchor, sec in anchors.items():
+    text, code = (" ".join(" ".join(t).split()) for t in section_text(sec.children[1:], [], []))
+    sec_title = str(sec.children[0].children[0])
+    search_index.add((anchor, sec_title, f"{text} {code}".strip()), title=sec_title, text=text, code=code)
+
+# The same index for the browser: minified JSON, content-hashed, fetched on first focus of the search box.
+search_files = {}   # {url: index}, served by the .json route
+if CLIENT_SEARCH:
+    search_json = json.dumps(compact(search_index, lambda d: d[:2]), separators=(",", ":")).encode()
+    search_url = f"search-index.{sha256(search_json).hexdigest()[:8]}.json"
+    search_files[search_url] = Prerendered(search_json, media_type="application/json", compress=PRECOMPRESS)
+    search_box.attrs["data-index"] = search_url
+
+# BM25 as in code/search.py, over the prebuilt index
+client_search = Script('''
+(function () {
+  const box = document.getElementById("search"), out = document.getElementById("search-results");
+  const terms = s => s.toLowerCase().match(/[a-z0-9]+/g) || [];
+  let index, loading;
+  function load() {
+    return loading || (loading = fetch(box.dataset.index).then(r => r.json()).then(function (ix) {
+      ix.p = {};
+      for (const t in ix.t) {
+        const m = ix.p[t] = new Map();
+        for (let i = 0, d = 0; i < ix.t[t].length; i += 2) m.set(d += ix.t[t][i], ix.t[t][i + 1]);
+      }
+      ix.avg = ix.n.reduce((a, b) => a + b, 0) / ix.n.length;
+      return index = ix;
+    }));
+  }
+  function search(q) {
+    const scores = new Map(), N = index.d.length, k1 = index.k1, b = index.b;
+    for (const t of new Set(terms(q))) {
+      const p = index.p[t];
+      if (!p) continue;
+      const idf = Math.log(1 + (N - p.size + 0.5) / (p.size + 0.5));
+      p.forEach(function (f, d) {
+        const norm = k1 * (1 - b + b * index.n[d] / index.avg);
+        scores.set(d, (scores.get(d) || 0) + idf * f * (k1 + 1) / (f + norm));
+      });
+    }
+    return [...scores].sort((x, y) => y[1] - x[1]).slice(0, 10).map(x => index.d[x[0]]);
+  }
+  function render() {
+    const q = box.value.trim(), hits = q ? search(q) : [];
+    out.replaceChildren();
+    if (!q) return;
+    if (!hits.length) {
+      const p = document.createElement("p");
+      p.className = "search-empty"; p.textContent = "No results.";
+      return out.append(p);
+    }
+    const ul = document.createElement("ul");
+    ul.className = "search-results";
+    for (const [anchor, title] of hits) {
+      const li = document.createElement("li"), a = document.createElement("a"), small = document.createElement("small");
+      a.href = "#" + anchor; a.textContent = title; small.textContent = anchor;
+      li.append(a, document.createElement("br"), small); ul.append(li);
+    }
+    out.append(ul);
+  }
+  box.addEventListener("focus", load, {once: true});
+  box.addEventListener("input", () => load().then(render));
+})();
+''')
+
+# Suggestions: headings & span_code() contents (.grid, aria-busy…), each pointing to its section
+def inline_codes(c):
+    for o in c:
+        tag = getattr(o, 'tag', '')
+        if tag in ('section', 'pre'): continue
+        if tag == 'code' and 'inline-code' in o.attrs.get('class', ''):
+            yield unescape(re.sub(r'<[^>]+>', '', "".join(map(str, o.children)))).strip()
+        else: yield from inline_codes(getattr(o, 'children', ()))
+
+suggester = Suggester([(str(sec.children[0].children[0]), anchor) for anchor, sec in anchors.items()] +
+                      [(s, anchor) for anchor, sec in anchors.items() for s in inline_codes(sec.children[1:]) if 0 < len(s) <= 40])
+
+@lru_cache(maxsize=1024)
+def suggestions(q:str) -> tuple:
+    return tuple(suggester.suggest(q))
+
+# The home page, whichever way it's served: stream=True marks the header & sections as Slots for stream_doc().
+def home_page(stream=False):
+    c = (title, html, Slot(top_header) if stream else top_header,
+         main(sections, aside_tags=toc() if TOC else None, lazy=LAZY, slot=stream), bottom_footer)
+    if SEARCH and CLIENT_SEARCH: c += (client_search,)
+    if LAZY: c += (lazy_anchors,)
+    return c
+
+page = home_page()
+
+# Content only changes when this file does: use its mtime for Last-Modified.
+# The page also links (by hash) or inlines the static assets: editing a stylesheet changes it too.
+src_mtime = os.path.getmtime(__file__)
+page_mtime = max([src_mtime, *(os.path.getmtime(os.path.join(root, p)) for p in find_assets(root))])
+home = prerender(page, app=app, last_modified=page_mtime, compress=PRECOMPRESS) if PRERENDER else None
+modal = Prerendered(render_modal().encode(), last_modified=src_mtime, compress=PRECOMPRESS)
+no_modal = Prerendered(b"", last_modified=src_mtime)
+toc_fragment = Prerendered(render_ft(toc()), last_modified=src_mtime, compress=PRECOMPRESS)
+page_chunks = stream_doc(*home_page(stream=True), app=app) if STREAM else None
+
+sections_by_id = {sid: node.render() for sid, node in registry.items()}
+fragments = FragmentCache(sections_by_id, last_modified=src_mtime, compress=PRECOMPRESS)
 
 # Home page
 @rt("/")
-def get(): # type: ignore
+def get(req): # type: ignore
+    if PRERENDER: return home.response(req)
+    if STREAM: return StreamingResponse(page_chunks(), media_type="text/html; charset=utf-8")
     return page
 
+# Any section by id, e.g. /section/4.3 (also used by lazy mode)
+@rt("/section/{sid}")
+def get(req, sid:str): # type: ignore
+    if sid not in fragments: return Response("Section not found", status_code=404)
+    return fragments.get(sid).response(req)
+
+def search_results(q:str):
+    hits = search_index.search(q) if q.strip() else []
+    if not hits: return P("No results.", cls="search-empty") if q.strip() else ""
+    pat = query_re(q)   # compiled once for all the snippets
+    return Ul(*[Li(A(sec_title, href=f"#{anchor}"), Br(), Small(NotStr(snippet(body, pat))))
+                for _, (anchor, sec_title, body) in hits], cls="search-results")
+
+# Serialized results by query: repeated queries (typing, backspacing) skip the FT tree & to_xml().
+@lru_cache(maxsize=1024)
+def search_fragment(q:str) -> bytes:
+    return render_ft(search_results(q)) if q else b""
+
+def suggestion_list(q:str):
+    hits = suggestions(q.strip().lower())
+    if not hits: return ""
+    return Ul(*[Li(A(label, href=f"#{anchor}"), " ", Small(anchor)) for label, anchor in hits], cls="suggestions")
+
+# Search results, e.g. /search?q=disabled+button
+@rt("/search")
+def get(q:str=""): # type: ignore
+    return Response(search_fragment(q.strip()), media_type="text/html; charset=utf-8")
+
+# Typeahead, e.g. Input(name="q", hx_get="/suggest", hx_trigger="keyup changed delay:150ms", hx_target="#suggestions")
+@rt("/suggest")
+def get(q:str=""): # type: ignore
+    return suggestion_list(q)
+
+# Table of contents alone, e.g. for hx-get="/toc" into a sidebar
+@rt("/toc")
+def get(req): # type: ignore
+    return toc_fragment.response(req)
+
+# Deep links: /go/forms/input/disabled → /#forms/input/disabled (paths of titles & title-only anchors work too)
+@rt("/go/{anchor:path}")
+def get(anchor:str): # type: ignore
+    anchor = anchor.strip("/").lower()
+    anchor = anchor if anchor in anchors else title_paths.get(anchor) or legacy_anchors.get(anchor)
+    if anchor is None: return Response("Anchor not found", status_code=404)
+    return RedirectResponse(f"/#{anchor}", status_code=302)
+
 @rt("/modal")
-async def get(): # type: ignore
-    return HTMLResponse(content=render_modal())
+async def get(req): # type: ignore
+    return modal.response(req)
 
 @rt("/close_modal")
-async def get():
-    return HTMLResponse(content="")
+async def get(req):
+    return no_modal.response(req)
+
+
+#-----------------------------------------------------------------------------
+# Build steps
+#   python main.py vendor           → pinned copies of CDN assets in vendor/
+#   python main.py build            → purged Pico, precompressed .gz/.zst siblings of style/* and vendor/*
+#   python main.py export [dist]    → static site
+def export_pages():
+    pages = {
+        "/": home.body if PRERENDER else render_app_doc(page, app=app),
+        "/modal": modal.body,
+        "/close_modal": no_modal.body,
+    }
+    pages.update({f"/section/{sid}": fragments.get(sid).body for sid in sections_by_id})
+    pages.update({f"/{url}": f.body for url, f in bundles.items()})
+    if CLIENT_SEARCH: pages.update({f"/{url}": f.body for url, f in search_files.items()})
+    return pages
+
+# Keep only the Pico rules matching tags, classes, roles, aria-* etc. used in the page (with its ToC <aside>,
+# also served alone at /toc), in the modal, and in search results & suggestions (<mark>, <small>…), swapped in later.
+# data-theme (and other JS-toggled attributes) selectors are always kept.
+def purge_pico():
+    src = os.path.join(root, pico_src)
+    if not os.path.isfile(src): return None
+    used = Used().add_ft(main(sections, aside_tags=toc()), top_header, bottom_footer).add_html(render_modal())
+    used.add_ft(search_results("button"), search_results("qqq"), suggestion_list("but"))
+    with open(src) as f: css = purge(f.read(), used)
+    with open(os.path.join(root, pico_purged), "w") as f: f.write(css)
+    return pico_purged
+
+if __name__ == "__main__":
+    import sys
+    cmd, args = (sys.argv[1:2] or [""])[0], sys.argv[2:]
+    if cmd == "vendor":
+        failed = fetch(root, force="--force" in args)
+        print(f"Failed: {', '.join(failed)}" if failed else "vendor/ is up to date")
+    elif cmd == "build":
+        if PURGE_CSS:
+            out = purge_pico()
+            print(f"Wrote {out}" if out else f"No {pico_src} to purge (python main.py vendor)")
+        files = compress_assets(root)
+        print(f"Wrote {len(files)} precompressed files")
+    elif cmd == "export":
+        dist = args[0] if args else "dist"
+        files = export(dist, export_pages(), root=root)
+        if SEARCH and not CLIENT_SEARCH: print("Note: search needs the /search route, set CLIENT_SEARCH = True for static hosting")
+        print(f"Exported {len(files)} files to {dist}/")
@@ -1,5 +1,9 @@
 from fasthtml.common import * # type: ignore
 import json
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))    # repo root, for `code`
+from code.bundle import Bundle, bundled
 
 # NOTE: This was the original project that gave birth to single_page.py
 #       Eventually, it will all be merged as one single app, with user-chosen variations:
@@ -43,22 +47,36 @@ demo_css = Link(            # Override some Prism styles
     )
 prism_js = Script(src="style/prism.js")
 
+# Bundles: one stylesheet & one deferred script instead of 3 + 1 (run from the repo root).
+css_bundle = Bundle(["style/prism.css", "style/prism-one-dark.css", "style/demo.css"], "style/demo-bundle.css")
+js_bundle  = Bundle(["style/prism.js"], "style/demo-bundle.js")
+bundles = {**css_bundle.files, **js_bundle.files}
+bundle_css = Link(rel="stylesheet", href=css_bundle.url, type="text/css")
+bundle_js  = Script(src=js_bundle.url, defer=True)
+
 # css_overrides = []
 # css = Style(" ".join(o for o in css_overrides))
-app = FastHTML(hdrs=(
+app = FastHTML(hdrs=bundled((
     head,
     pico_css,
     prism_css,
     prism_css_theme,
     demo_css, 
     # css,         # use for in-file custom CSS; otherwise in demo.css
-    ))
+    ), (prism_css, prism_css_theme, demo_css), bundle_css))
 rt = app.route
 
 # This line ensures that the static files are served from the static folder.
 # (req. for favicon, CSS etc.)
 @rt("/{fname:path}.{ext:static}")
-async def get(fname:str, ext:str): return FileResponse(f'{fname}.{ext}') # type: ignore
+async def get(req, fname:str, ext:str): # type: ignore
+    if f'{fname}.{ext}' in bundles: return bundles[f'{fname}.{ext}'].response(req)
+    return FileResponse(f'{fname}.{ext}')
+
+@rt("/{fname:path}.map") # Source maps of bundles
+def get(req, fname:str): # type: ignore
+    if f'{fname}.map' not in bundles: return Response("Not found", status_code=404)
+    return bundles[f'{fname}.map'].response(req)
 
 # TODO: functionalize all of it
 #       [x] Colors
@@ -317,7 +335,7 @@ top_header = Header(
 
 main   = Main(test, sections, cls='container line-numbers')
 footer = Footer(Hr(), footer_text, cls='container')
-scripts = Script(src="style/prism.js")
+scripts = bundle_js
 
 website = (html, Title(title), top_header, main, footer, scripts)
 